@@ -0,0 +1,214 @@
+"""
+Benchmarks of the stages of homsmall over fixed samples of graphs
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import timeit
+import homsmall
+import decomposability
+import graph6
+
+
+STAGES = ["pipeline", "homotopy_type", "homotopy_type_s_c", "collapse",
+          "betti_numbers_c", "is_vertex_decomposable"]
+
+
+def sample_graphs(patterns, files, window, size, seed):
+    """Returns a list of (name, index, graph6 bytes) triples of graphs
+    accepted by conditions().
+
+    The generator seeded with seed picks files input files, a window of
+    consecutive graphs in each one, and size graphs among those of the
+    window which pass the conditions"""
+    generator = random.Random(seed)
+    filenames = homsmall.input_files(patterns)
+    sample = []
+    for filename in generator.sample(filenames, min(files, len(filenames))):
+        with open(filename, 'rb') as g6_file:
+            lines = sum(1 for line in g6_file)
+        start = generator.randrange(max(lines - window, 0) + 1)
+        survivors = [(os.path.basename(filename), index, line)
+                     for index, line, offset
+                     in graph6.read_lines(filename, start=start,
+                                          stop=start + window)
+                     if homsmall.bitmask_conditions(graph6.decode(line))]
+        sample.extend(generator.sample(survivors,
+                                       min(size, len(survivors))))
+    return sample
+
+
+def table_graphs(table, filename):
+    """Returns the (name, index, graph6 bytes) triples of the graphs of
+    filename whose indices are listed in the first column of table"""
+    with open(table, encoding="utf8") as the_file:
+        indices = {int(row["index"]) for row in csv.DictReader(the_file)}
+    return [(os.path.basename(filename), index, line)
+            for index, line, offset in graph6.read_lines(filename)
+            if index in indices]
+
+
+def reset(seed):
+    """Empties the tables kept by homsmall between calls, so that every
+    stage is timed without results of earlier ones"""
+    decomposability._TABLE.clear()
+    homsmall.configure_matching(seed)
+
+
+def _timed(times, stage, seed, function, *arguments):
+    reset(seed)
+    start_time = timeit.default_timer()
+    result = function(*arguments)
+    times.setdefault(stage, []).append(timeit.default_timer() - start_time)
+    return result
+
+
+def run_stages(graphs, stages, seed=0):
+    """Runs the stages on every graph and returns a dictionary from stage
+    names to the list of times of their calls. The tables of homsmall are
+    emptied, and Dong's matching seeded with seed, before every call"""
+    times = {}
+    for name, index, line in graphs:
+        if "pipeline" in stages:
+            _timed(times, "pipeline", seed, homsmall.process_chunk,
+                   ([(index, line)], 0, False))
+        p_g = homsmall.p(graph6.to_networkx(graph6.decode(line)))
+        if "homotopy_type" in stages:
+            _timed(times, "homotopy_type", seed, homsmall.homotopy_type, p_g)
+        s_c = homsmall.clique_complex(p_g)
+        if "homotopy_type_s_c" in stages:
+            _timed(times, "homotopy_type_s_c", seed,
+                   homsmall.homotopy_type_s_c, s_c)
+        if "collapse" in stages:
+            _timed(times, "collapse", seed, homsmall.collapse, s_c)
+        if "betti_numbers_c" in stages:
+            _timed(times, "betti_numbers_c", seed, homsmall.betti_numbers_c,
+                   s_c)
+        if "is_vertex_decomposable" in stages:
+            _timed(times, "is_vertex_decomposable", seed,
+                   homsmall.is_vertex_decomposable, s_c)
+    return times
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of a sorted list"""
+    rank = max(math.ceil(fraction * len(values)), 1)
+    return values[rank - 1]
+
+
+def summary(times):
+    """Returns a dictionary from stage names to their statistics"""
+    stats = {}
+    for stage, values in times.items():
+        values = sorted(values)
+        total = sum(values)
+        stats[stage] = {"calls": len(values),
+                        "time": total,
+                        "throughput": len(values)/total if total else 0.0,
+                        "p50": percentile(values, 0.5),
+                        "p90": percentile(values, 0.9),
+                        "p99": percentile(values, 0.99),
+                        "max": values[-1]}
+    return stats
+
+
+def regressions(stats, baseline, tolerance):
+    """Returns a list of messages for the statistics which are worse than
+    those of baseline by more than the fraction tolerance"""
+    messages = []
+    for stage, current in stats.items():
+        if stage not in baseline:
+            continue
+        for measure in ("p50", "p90", "time"):
+            before = baseline[stage][measure]
+            if current[measure] > before * (1 + tolerance):
+                messages.append(f"{stage} {measure}: {current[measure]:.6f}"
+                                f" s, baseline {before:.6f} s")
+    return messages
+
+
+def print_summary(stats, out=sys.stdout):
+    print("| stage | calls | graphs/s | p50 (ms) | p90 (ms) | p99 (ms) "
+          "| max (ms) |", file=out)
+    print("|-------+-------+----------+----------+----------+----------"
+          "+----------|", file=out)
+    for stage in STAGES:
+        if stage not in stats:
+            continue
+        row = stats[stage]
+        print(f"|{stage}|{row['calls']}|{row['throughput']:.1f}"
+              f"|{1000*row['p50']:.3f}|{1000*row['p90']:.3f}"
+              f"|{1000*row['p99']:.3f}|{1000*row['max']:.3f}|", file=out)
+
+
+def main():
+    """Main function"""
+    homsmall.configure_cache(0)
+    homsmall.configure_dedup(0)
+    homsmall.configure_backend(args.backend)
+    graphs = sample_graphs(args.filenames, args.files, args.window,
+                           args.size, args.seed)
+    if args.table_graphs is not None:
+        graphs.extend(table_graphs(args.table, args.table_graphs))
+    stages = args.stages.split(",") if args.stages else STAGES
+    times = {}
+    for _ in range(args.repeat):
+        for stage, values in run_stages(graphs, stages, args.seed).items():
+            times.setdefault(stage, []).extend(values)
+    stats = summary(times)
+    print(f"{len(graphs)} graphs, seed {args.seed}")
+    print_summary(stats)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding="utf8") as the_file:
+            json.dump(stats, the_file, indent=1)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline {args.baseline} to compare with; store one with "
+              f"--save-baseline")
+        return 0
+    with open(args.baseline, encoding="utf8") as the_file:
+        baseline = json.load(the_file)
+    messages = regressions(stats, baseline, args.tolerance)
+    for message in messages:
+        print(f"Regression in {message}")
+    return 1 if messages else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("filenames", nargs='*',
+                        default=["data/graph10c*.g6"],
+                        help="graph6 files or glob patterns the sample is "
+                        "drawn from")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the sample and of Dong's matching")
+    parser.add_argument("--files", type=int, default=4,
+                        help="number of files sampled")
+    parser.add_argument("--window", type=int, default=2000,
+                        help="consecutive graphs read from each file")
+    parser.add_argument("--size", type=int, default=25,
+                        help="graphs taken from each file")
+    parser.add_argument("--table", default="table.csv",
+                        help="CSV table whose index column lists hard graphs")
+    parser.add_argument("--table-graphs",
+                        help="graph6 file the indices of --table refer to, "
+                        "e.g. the connected graphs on 8 vertices")
+    parser.add_argument("--stages",
+                        help="comma separated stages to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="times the sample is run")
+    parser.add_argument("--backend", choices=["pycliques", "bitmask"],
+                        default="pycliques")
+    parser.add_argument("--baseline", default="bench_baseline.json",
+                        help="JSON file with the statistics compared with")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the statistics as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="fraction by which a statistic may exceed the "
+                        "baseline before it counts as a regression")
+    args = parser.parse_args()
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Simplicial complexes with facets stored as bitmasks, used for fast
+collapses
+"""
+from collections import deque
+from pycliques.simplicial import Simplex, SimplicialComplex
+
+
+def bits(mask):
+    """Yields the powers of two whose sum is mask"""
+    while mask:
+        low = mask & -mask
+        yield low
+        mask = mask ^ low
+
+
+def maximal(masks):
+    """Returns the set of nonzero masks not contained in another one"""
+    result = []
+    for mask in sorted(set(masks), key=lambda m: -bin(m).count("1")):
+        if mask and not any(mask & other == mask for other in result):
+            result.append(mask)
+    return set(result)
+
+
+class BitComplex(object):
+    """A simplicial complex given by its facets.
+
+    Vertex number i is the bit 1 << i of a mask, and labels[i] is the
+    vertex of the original complex. incidence maps every vertex bit to the
+    set of facets containing it; it is built the first time it is used.
+
+    Stars, links, deletions and intersections are returned as complexes
+    on the same vertices, which share labels and index with self."""
+
+    def __init__(self, labels, facets, index=None):
+        self.labels = labels
+        if index is None:
+            index = {vertex: i for i, vertex in enumerate(labels)}
+        self.index = index
+        self.facets = set(facets)
+        self._incidence = None
+
+    @classmethod
+    def from_facets(cls, facets):
+        """Returns the BitComplex with the given facets, which are
+        iterables of vertices"""
+        facets = [frozenset(f) for f in facets]
+        b_complex = cls(list(set().union(*facets)), [])
+        for facet in facets:
+            b_complex._add_facet(b_complex.to_mask(facet))
+        return b_complex
+
+    @property
+    def incidence(self):
+        if self._incidence is None:
+            self._incidence = {}
+            for facet in self.facets:
+                for b in bits(facet):
+                    self._incidence.setdefault(b, set()).add(facet)
+        return self._incidence
+
+    @classmethod
+    def from_complex(cls, s_complex):
+        """Returns the BitComplex of a pycliques SimplicialComplex"""
+        return cls.from_facets(s_complex.facet_set)
+
+    def to_simplex(self, mask):
+        """Returns the Simplex with vertices given by mask"""
+        return Simplex({self.labels[b.bit_length()-1] for b in bits(mask)})
+
+    def to_mask(self, simplex):
+        """Returns the mask of a simplex of the complex"""
+        return sum(1 << self.index[v] for v in simplex)
+
+    def to_complex(self):
+        """Returns the pycliques SimplicialComplex with the same facets"""
+        facets = {self.to_simplex(f) for f in self.facets}
+        vertices = set.union(set(), *(set(f) for f in facets))
+        return SimplicialComplex(vertices, facet_set=facets)
+
+    def _add_facet(self, facet):
+        self.facets.add(facet)
+        if self._incidence is None:
+            return
+        for b in bits(facet):
+            self._incidence.setdefault(b, set()).add(facet)
+
+    def _remove_facet(self, facet):
+        self.facets.discard(facet)
+        if self._incidence is None:
+            return
+        for b in bits(facet):
+            incident = self._incidence[b]
+            incident.discard(facet)
+            if not incident:
+                del self._incidence[b]
+
+    def view(self, facets):
+        """Returns the complex with the given facets on the vertices of
+        self"""
+        return BitComplex(self.labels, facets, self.index)
+
+    def vertex_mask(self):
+        """Returns the mask of all the vertices of the complex"""
+        return sum(self.incidence)
+
+    def dimension(self):
+        return max((bin(f).count("1") for f in self.facets), default=0) - 1
+
+    def star(self, mask):
+        """Returns the star of the simplex mask"""
+        return self.view(self.facets_containing(mask))
+
+    def star_cluster(self, mask):
+        """Returns the union of the stars of the vertices in mask"""
+        facets = set()
+        for b in bits(mask):
+            facets.update(self.incidence.get(b, ()))
+        return self.view(facets)
+
+    def link(self, mask):
+        """Returns the link of the simplex mask"""
+        return self.view(maximal(f ^ mask
+                                  for f in self.facets_containing(mask)))
+
+    def deletion(self, mask):
+        """Returns the complex of the simplices disjoint from mask"""
+        return self.view(maximal(f & ~mask for f in self.facets))
+
+    def intersection(self, other):
+        """Returns the complex of the simplices of both self and other,
+        which must have the same labels"""
+        return self.view(maximal(f & g for f in self.facets
+                                  for g in other.facets))
+
+    def facets_containing(self, mask):
+        """Returns the list of facets containing the simplex mask"""
+        if mask == 0:
+            return list(self.facets)
+        candidates = min((self.incidence.get(b, ()) for b in bits(mask)),
+                         key=len)
+        return [f for f in candidates if f & mask == mask]
+
+    def is_free_face(self, mask):
+        """Returns True if mask is a free face of the complex"""
+        return (mask not in self.facets and
+                len(self.facets_containing(mask)) == 1)
+
+    def free_face(self, facet):
+        """Returns a minimal free face contained in facet, or None"""
+        free = None
+        for b in bits(facet):
+            face = facet ^ b
+            if face and len(self.facets_containing(face)) == 1:
+                free = face
+                break
+        if free is None:
+            return None
+        for b in bits(free):
+            face = free ^ b
+            if face and len(self.facets_containing(face)) == 1:
+                free = face
+        return free
+
+    def remove_simplex(self, mask):
+        """Removes mask and every face of the complex containing it.
+
+        mask is expected to be contained in a single facet. Returns the
+        list of new facets."""
+        facet = self.facets_containing(mask)[0]
+        self._remove_facet(facet)
+        new_facets = []
+        for b in bits(mask):
+            face = facet ^ b
+            if face and not self.facets_containing(face):
+                new_facets.append(face)
+        for face in new_facets:
+            self._add_facet(face)
+        return new_facets
+
+    def collapse(self, verbose=False):
+        """Performs elementary collapses while there are free faces.
+
+        Facets whose free faces may have changed after a collapse are put
+        back in a work queue, so only those are searched again. A single
+        simplex is collapsed to its first vertex."""
+        queue = deque(self.facets)
+        queued = set(self.facets)
+        while queue:
+            if len(self.incidence) <= 1:
+                return self
+            if len(self.facets) == 1:
+                facet = next(iter(self.facets))
+                self._remove_facet(facet)
+                self._add_facet(facet & -facet)
+                return self
+            facet = queue.popleft()
+            queued.discard(facet)
+            if facet not in self.facets:
+                continue
+            free = self.free_face(facet)
+            if free is None:
+                continue
+            if verbose:
+                print(f"Free face: {self.to_simplex(free)}")
+            new_facets = self.remove_simplex(free)
+            touched = set(new_facets)
+            for b in bits(facet):
+                touched.update(self.incidence.get(b, ()))
+            for face in touched - queued:
+                queue.append(face)
+                queued.add(face)
+        return self
@@ -0,0 +1,142 @@
+"""
+Small graphs with neighbourhoods stored as bitmasks, used for fast clique
+graphs, paring and Helly tests
+"""
+import networkx as nx
+from bitcomplex import bits
+
+
+MAX_ORDER = 64
+
+
+def _index(bit):
+    return bit.bit_length() - 1
+
+
+class BitGraph(object):
+    """A graph given by the neighbourhoods of its vertices.
+
+    Vertex number i is the bit 1 << i of a mask, rows[i] is the mask of
+    its neighbours and labels[i] is the vertex of the original graph."""
+
+    def __init__(self, labels, rows):
+        self.labels = labels
+        self.rows = rows
+
+    @classmethod
+    def from_networkx(cls, graph):
+        """Returns the BitGraph of a networkx graph, with vertices in the
+        order of graph.nodes"""
+        labels = list(graph)
+        index = {vertex: i for i, vertex in enumerate(labels)}
+        rows = [sum(1 << index[u] for u in graph[v]) for v in labels]
+        return cls(labels, rows)
+
+    def to_networkx(self):
+        """Returns the networkx graph with the same vertices and edges"""
+        graph = nx.Graph()
+        graph.add_nodes_from(self.labels)
+        for i, row in enumerate(self.rows):
+            for b in bits(row & ~((2 << i) - 1)):
+                graph.add_edge(self.labels[i], self.labels[_index(b)])
+        return graph
+
+    def order(self):
+        return len(self.rows)
+
+    def relabeled(self):
+        """Returns the same graph with vertices labeled 0, 1, ..."""
+        return BitGraph(list(range(self.order())), self.rows)
+
+    def subgraph(self, mask):
+        """Returns the subgraph induced by the vertices in mask"""
+        kept = [_index(b) for b in bits(mask)]
+        position = {i: j for j, i in enumerate(kept)}
+        rows = [sum(1 << position[_index(b)] for b in bits(self.rows[i] & mask))
+                for i in kept]
+        return BitGraph([self.labels[i] for i in kept], rows)
+
+    def cliques(self):
+        """Yields the masks of the maximal cliques, found by Bron-Kerbosch
+        with the pivot of Tomita et al."""
+        rows = self.rows
+        stack = [(0, (1 << self.order()) - 1, 0)]
+        while stack:
+            clique, candidates, excluded = stack.pop()
+            if candidates == 0:
+                if excluded == 0:
+                    yield clique
+                continue
+            pivot = max(bits(candidates | excluded),
+                        key=lambda b: bin(candidates & rows[_index(b)]).count("1"))
+            for b in bits(candidates & ~rows[_index(pivot)]):
+                row = rows[_index(b)]
+                stack.append((clique | b, candidates & row, excluded & row))
+                candidates ^= b
+                excluded |= b
+
+    def clique_graph(self, bound=23):
+        """Returns the clique graph, with the sets of labels of the cliques
+        as labels, or None if there are more than bound cliques"""
+        cliques = []
+        for clique in self.cliques():
+            if len(cliques) == bound:
+                return None
+            cliques.append(clique)
+        rows = [0] * len(cliques)
+        for i, first in enumerate(cliques):
+            for j in range(i):
+                if first & cliques[j]:
+                    rows[i] |= 1 << j
+                    rows[j] |= 1 << i
+        labels = [frozenset(self.labels[_index(b)] for b in bits(c))
+                  for c in cliques]
+        return BitGraph(labels, rows)
+
+    def _closed(self, mask):
+        return [(row & mask) | (1 << i) for i, row in enumerate(self.rows)]
+
+    def dominated_vertex(self, mask=None):
+        """Returns the index of a vertex in mask whose closed neighbourhood
+        is contained in the closed neighbourhood of another vertex, or
+        None if there is none"""
+        if mask is None:
+            mask = (1 << self.order()) - 1
+        closed = self._closed(mask)
+        for v in bits(mask):
+            i = _index(v)
+            for u in bits(self.rows[i] & mask):
+                if closed[i] & ~closed[_index(u)] == 0:
+                    return i
+        return None
+
+    def has_dominated_vertex(self):
+        return self.dominated_vertex() is not None
+
+    def pared(self):
+        """Returns the completely pared graph, removing dominated vertices
+        while there are any and at least two vertices are left"""
+        mask = (1 << self.order()) - 1
+        while mask & (mask - 1):
+            vertex = self.dominated_vertex(mask)
+            if vertex is None:
+                break
+            mask ^= 1 << vertex
+        return self.subgraph(mask)
+
+    def is_clique_helly(self):
+        """Returns True if the graph is clique-Helly, using that it is so
+        if and only if every extended triangle has a universal vertex"""
+        closed = self._closed((1 << self.order()) - 1)
+        for a, row in enumerate(self.rows):
+            for b_bit in bits(row & ~((2 << a) - 1)):
+                b = _index(b_bit)
+                for c_bit in bits(row & self.rows[b] & ~((2 << b) - 1)):
+                    c = _index(c_bit)
+                    extended = ((closed[a] & closed[b]) |
+                                (closed[a] & closed[c]) |
+                                (closed[b] & closed[c]))
+                    if not any(extended & ~closed[_index(u)] == 0
+                               for u in bits(extended)):
+                        return False
+        return True
@@ -0,0 +1,128 @@
+"""
+Vertex decomposability of simplicial complexes
+"""
+from collections import OrderedDict
+from math import comb
+from bitcomplex import BitComplex, bits
+
+TABLE_SIZE = 10000
+_TABLE = OrderedDict()
+
+
+def _link(facets, b):
+    """Returns the facets of the link of the vertex b"""
+    return frozenset(f ^ b for f in facets if f & b)
+
+
+def _deletion(facets, b):
+    """Returns the facets of the deletion of the vertex b, and whether b
+    is a shedding vertex, that is, no facet of the link of b is a facet of
+    the deletion"""
+    outside = [f for f in facets if not f & b]
+    inner = [f ^ b for f in facets if f & b]
+    kept = [g for g in inner if not any(g & h == g for h in outside)]
+    return frozenset(outside + kept), not kept
+
+
+def _size(mask):
+    return bin(mask).count("1")
+
+
+def _h_vector_nonnegative(facets, dim):
+    """Returns True if the h-vector of a pure complex of dimension dim is
+    nonnegative, a necessary condition for shellability"""
+    faces = set()
+    for facet in facets:
+        sub = facet
+        while sub:
+            faces.add(sub)
+            sub = (sub - 1) & facet
+    f_vector = [1] + [0] * (dim + 1)
+    for face in faces:
+        f_vector[_size(face)] += 1
+    for k in range(dim + 2):
+        h_k = sum((-1) ** (k - i) * comb(dim + 1 - i, k - i) * f_vector[i]
+                  for i in range(k + 1))
+        if h_k < 0:
+            return False
+    return True
+
+
+def _decompose(facets, table):
+    """Returns a list of (vertex bit, certificate of the link) pairs giving
+    the shedding vertices of successive deletions, or None if the complex
+    is not vertex decomposable"""
+    if len(facets) <= 1:
+        return []
+    if facets in table:
+        return table[facets]
+    cone = -1
+    for facet in facets:
+        cone = cone & facet
+    if cone:
+        # a cone is vertex decomposable iff its base is
+        certificate = _decompose(frozenset(f ^ cone for f in facets), table)
+        table[facets] = certificate
+        return certificate
+    sizes = {_size(f) for f in facets}
+    pure = len(sizes) == 1
+    certificate = None
+    if not pure or _h_vector_nonnegative(facets, sizes.pop() - 1):
+        incidence = {}
+        for facet in facets:
+            for b in bits(facet):
+                incidence[b] = incidence.get(b, 0) + 1
+        for b in sorted(incidence, key=incidence.get):
+            deletion, shedding = _deletion(facets, b)
+            if not shedding:
+                continue
+            link_certificate = _decompose(_link(facets, b), table)
+            if link_certificate is None:
+                if pure:
+                    # links of pure vertex decomposable complexes are
+                    # vertex decomposable
+                    break
+                continue
+            del_certificate = _decompose(deletion, table)
+            if del_certificate is not None:
+                certificate = [(b, link_certificate)] + del_certificate
+                break
+    table[facets] = certificate
+    return certificate
+
+
+def _relabel(certificate, b_complex):
+    return [(b_complex.labels[b.bit_length()-1],
+             _relabel(link_certificate, b_complex))
+            for b, link_certificate in certificate]
+
+
+def vertex_decomposition(facets):
+    """Returns a certificate of vertex decomposability of the complex with
+    the given facets, or None if it is not vertex decomposable.
+
+    The certificate is a list of pairs (vertex, certificate of its link):
+    the first vertex is a shedding vertex of the complex, the second one a
+    shedding vertex of the deletion of the first one, and so on, until the
+    deletion is a simplex. Results are kept in a table keyed on the facet
+    set, and subcomplexes are shared between the branches of the search."""
+    key = frozenset(frozenset(f) for f in facets)
+    if key in _TABLE:
+        _TABLE.move_to_end(key)
+        return _TABLE[key]
+    b_complex = BitComplex.from_facets(key)
+    certificate = _decompose(frozenset(b_complex.facets), {})
+    if certificate is not None:
+        certificate = _relabel(certificate, b_complex)
+    _TABLE[key] = certificate
+    if len(_TABLE) > TABLE_SIZE:
+        _TABLE.popitem(last=False)
+    return certificate
+
+
+def is_shedding_vertex(facets, vertex):
+    """Returns True if vertex is a shedding vertex of the complex with the
+    given facets"""
+    b_complex = BitComplex.from_facets(facets)
+    b = 1 << b_complex.index[vertex]
+    return _deletion(frozenset(b_complex.facets), b)[1]
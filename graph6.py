@@ -0,0 +1,92 @@
+"""
+Streaming graph6 reader, decoding graphs as adjacency bitmasks
+"""
+import mmap
+import os
+import networkx as nx
+
+
+def decode(line):
+    """Returns the adjacency bitmasks of the graph in a graph6 line: bit j
+    of the i-th mask is set if i and j are adjacent"""
+    if line.startswith(b">>graph6<<"):
+        line = line[10:]
+    data = [c - 63 for c in line.rstrip()]
+    if data[0] < 63:
+        order, start = data[0], 1
+    elif data[1] < 63:
+        order, start = (data[1] << 12) | (data[2] << 6) | data[3], 4
+    else:
+        order, start = 0, 8
+        for value in data[2:8]:
+            order = (order << 6) | value
+    rows = [0] * order
+    i, j = 0, 1
+    for value in data[start:]:
+        for shift in (5, 4, 3, 2, 1, 0):
+            if j >= order:
+                return rows
+            if (value >> shift) & 1:
+                rows[i] |= 1 << j
+                rows[j] |= 1 << i
+            i = i + 1
+            if i == j:
+                i, j = 0, j + 1
+    return rows
+
+
+def max_degree(rows):
+    return max((bin(row).count("1") for row in rows), default=0)
+
+
+def has_dominated_vertex(rows):
+    """Returns True if the closed neighborhood of some vertex is contained
+    in the closed neighborhood of another one"""
+    closed = [row | (1 << v) for v, row in enumerate(rows)]
+    for vertex, row in enumerate(rows):
+        neighbours = row
+        while neighbours:
+            low = neighbours & -neighbours
+            if closed[vertex] & ~closed[low.bit_length() - 1] == 0:
+                return True
+            neighbours ^= low
+    return False
+
+
+def to_networkx(rows):
+    """Returns the graph with the given adjacency bitmasks, built in the
+    same order as nx.from_graph6_bytes"""
+    graph = nx.Graph()
+    graph.add_nodes_from(range(len(rows)))
+    for vertex, row in enumerate(rows):
+        earlier = row & ((1 << vertex) - 1)
+        while earlier:
+            low = earlier & -earlier
+            graph.add_edge(low.bit_length() - 1, vertex)
+            earlier ^= low
+    return graph
+
+
+def read_lines(filename, offset=0, first_index=0, start=0, stop=None):
+    """Yields the (index, line, end offset) triples of the graphs of a
+    graph6 file numbered from start up to stop, not included.
+
+    The file is memory mapped, and lines before start are skipped without
+    being decoded. Reading begins at offset, where the graph numbered
+    first_index is expected to be. Blank lines are skipped without
+    taking a number, as nx.read_graph6 does."""
+    with open(filename, 'rb') as g6_file:
+        if os.fstat(g6_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(g6_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            index = first_index
+            while offset < len(data) and (stop is None or index < stop):
+                end = data.find(b"\n", offset)
+                end = len(data) if end == -1 else end + 1
+                line = data[offset:end].strip()
+                offset = end
+                if not line:
+                    continue
+                if index >= start:
+                    yield index, line, end
+                index = index + 1
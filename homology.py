@@ -0,0 +1,162 @@
+"""
+Simplicial homology by sparse reduction of boundary matrices
+"""
+from fractions import Fraction
+from bitcomplex import BitComplex, bits
+
+
+def _faces_by_dimension(facets):
+    """Returns the list whose k-th entry is the set of masks of the
+    k-dimensional faces of the complex with the given facet masks"""
+    faces = []
+    for facet in facets:
+        sub = facet
+        while sub:
+            dim = bin(sub).count("1") - 1
+            while len(faces) <= dim:
+                faces.append(set())
+            faces[dim].add(sub)
+            sub = (sub - 1) & facet
+    return faces
+
+
+def _reduce_mod2(columns, cleared):
+    """Returns the rank of a matrix over GF(2) whose columns are given as
+    bitmasks of row numbers, and the set of pivot rows. Columns whose
+    number is in cleared are known to reduce to zero and are skipped"""
+    pivots = {}
+    for number, column in enumerate(columns):
+        if number in cleared:
+            continue
+        while column:
+            low = column.bit_length() - 1
+            if low not in pivots:
+                pivots[low] = column
+                break
+            column = column ^ pivots[low]
+    return len(pivots), set(pivots)
+
+
+def _reduce_field(columns, cleared, field):
+    """Like _reduce_mod2, over GF(field) for a prime field, or over the
+    rationals if field is 0. Columns are dictionaries from row numbers to
+    coefficients"""
+    if field == 0:
+        def inverse(a):
+            return 1 / Fraction(a)
+
+        def normal(a):
+            return a
+    else:
+        def inverse(a):
+            return pow(a, field - 2, field)
+
+        def normal(a):
+            return a % field
+    pivots = {}
+    for number, column in enumerate(columns):
+        if number in cleared:
+            continue
+        column = {row: normal(c) for row, c in column.items() if normal(c)}
+        while column:
+            low = max(column)
+            if low not in pivots:
+                factor = inverse(column[low])
+                pivots[low] = {row: normal(c * factor)
+                               for row, c in column.items()}
+                break
+            factor = column[low]
+            for row, c in pivots[low].items():
+                value = normal(column.get(row, 0) - factor * c)
+                if value:
+                    column[row] = value
+                else:
+                    column.pop(row, None)
+    return len(pivots), set(pivots)
+
+
+def _smith_diagonal(columns, size):
+    """Returns the absolute values of the nonzero entries of a diagonal
+    form of an integer matrix with size rows, reached by integer row and
+    column operations, so that the torsion of its cokernel is the sum of
+    the cyclic groups of those orders. Columns are dictionaries from row
+    numbers to coefficients"""
+    matrix = [[column.get(row, 0) for column in columns]
+              for row in range(size)]
+    diagonal = []
+    while True:
+        entries = [(abs(a), i, j) for i, row in enumerate(matrix)
+                   for j, a in enumerate(row) if a]
+        if not entries:
+            return diagonal
+        _, i, j = min(entries)
+        value = matrix[i][j]
+        cleared = True
+        for r, row in enumerate(matrix):
+            if r != i and row[j]:
+                factor = row[j] // value
+                matrix[r] = [a - factor * b for a, b in zip(row, matrix[i])]
+                cleared = cleared and matrix[r][j] == 0
+        for c in range(len(matrix[i])):
+            if c != j and matrix[i][c]:
+                factor = matrix[i][c] // value
+                for row in matrix:
+                    row[c] = row[c] - factor * row[j]
+                cleared = cleared and matrix[i][c] == 0
+        if cleared:
+            diagonal.append(abs(value))
+            del matrix[i]
+            for row in matrix:
+                del row[j]
+
+
+def _boundary(faces, rows, field):
+    """Returns the columns of the boundary matrix of the given faces,
+    where rows maps every face of one dimension less to its row number"""
+    columns = []
+    for face in faces:
+        if field == 2:
+            column = 0
+            for b in bits(face):
+                column = column | (1 << rows[face ^ b])
+        else:
+            column = {}
+            for sign, b in enumerate(bits(face)):
+                column[rows[face ^ b]] = (-1) ** sign
+        columns.append(column)
+    return columns
+
+
+def betti_vector(facets, field=2, collapse=False):
+    """Returns the list of reduced Betti numbers of the simplicial complex
+    with the given facets, without trailing zeros.
+
+    facets is an iterable of iterables of vertices. The coefficients are
+    in GF(field) for a prime field (GF(2) by default), or in the rationals
+    if field is 0; the latter gives the ranks of the integral homology.
+    Every boundary matrix is built once and reduced with clearing, from
+    the top dimension down. If collapse is True, the complex is collapsed
+    first."""
+    b_complex = BitComplex.from_facets(facets)
+    if collapse:
+        b_complex.collapse()
+    faces = [sorted(d) for d in _faces_by_dimension(b_complex.facets)]
+    if not faces:
+        return []
+    ranks = [0] * (len(faces) + 1)
+    cleared = set()
+    for dim in range(len(faces) - 1, 0, -1):
+        rows = {face: row for row, face in enumerate(faces[dim - 1])}
+        columns = _boundary(faces[dim], rows, field)
+        if field == 2:
+            rank, pivots = _reduce_mod2(columns, cleared)
+        else:
+            rank, pivots = _reduce_field(columns, cleared, field)
+        ranks[dim] = rank
+        cleared = pivots
+    ranks[0] = 1
+    numbers = [len(faces[dim]) - ranks[dim] - ranks[dim + 1]
+               for dim in range(len(faces))]
+    while len(numbers) > 0 and numbers[-1] == 0:
+        del numbers[-1]
+    return numbers
@@ -2,24 +2,88 @@
 Calculates the homotopy type of graphs and their clique graphs
 """
 import argparse
-import random
-import re
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import signal
+import sys
 import timeit
-import mogutda
+from contextlib import contextmanager, nullcontext
+from functools import cached_property
 import networkx as nx
-from sympy import symbols, Poly, Add, Mul
-from pycliques.simplicial import (
-    Simplex,
-    SimplicialComplex,
-    clique_complex)
-from pycliques.dominated import completely_pared_graph as p
+import pycliques.cliques
+import pycliques.dominated
+import pycliques.helly
+import pycliques.simplicial
+from pycliques.simplicial import Simplex, SimplicialComplex
 from pycliques.dominated import (
     has_dominated_vertex,
     complete_s_collapse,
     complete_s_collapse_edges)
-from pycliques.cliques import clique_graph as k
-from pycliques.helly import is_clique_helly
 from pycliques.surfaces import open_neighborhood
+import decomposability
+import graph6
+import screening
+from bitcomplex import BitComplex, bits
+from bitgraph import MAX_ORDER, BitGraph
+from homology import betti_vector
+from htcache import GraphCache, graph_key
+from htypes import CONTRACTIBLE, HomotopyType
+from matching import MatchingStrategy
+from morse import MorseMatching
+from rulestats import RuleStats
+from sinks import flatten, open_sink
+
+
+def bit_graph(graph):
+    """Returns the BitGraph of graph if the bitmask backend is configured
+    and graph is small enough for it, None otherwise"""
+    if BACKEND == "bitmask" and graph.order() <= MAX_ORDER:
+        return BitGraph.from_networkx(graph)
+    return None
+
+
+def maximal_cliques(graph):
+    """Returns the maximal cliques of graph as sets of vertices"""
+    b_graph = bit_graph(graph)
+    if b_graph is None:
+        return [set(c) for c in nx.find_cliques(graph)]
+    return [{b_graph.labels[b.bit_length()-1] for b in bits(c)}
+            for c in b_graph.cliques()]
+
+
+def clique_complex(graph):
+    """Returns the complex of completes of graph"""
+    if bit_graph(graph) is None:
+        return pycliques.simplicial.clique_complex(graph)
+    facets = {Simplex(c) for c in maximal_cliques(graph)}
+    return SimplicialComplex(set(graph), facet_set=facets)
+
+
+def p(graph):
+    """Returns the completely pared graph of graph"""
+    b_graph = bit_graph(graph)
+    if b_graph is None:
+        return pycliques.dominated.completely_pared_graph(graph)
+    return b_graph.pared().to_networkx()
+
+
+def k(graph):
+    """Returns the clique graph of graph, or None if it is too large"""
+    b_graph = bit_graph(graph)
+    if b_graph is None:
+        return pycliques.cliques.clique_graph(graph)
+    k_graph = b_graph.clique_graph()
+    return k_graph.to_networkx() if k_graph is not None else None
+
+
+def is_clique_helly(graph):
+    b_graph = bit_graph(graph)
+    if b_graph is None:
+        return pycliques.helly.is_clique_helly(graph)
+    return b_graph.is_clique_helly()
 
 
 def simplify_ht(graph):
@@ -30,118 +94,490 @@ def simplify_ht(graph):
     return vev_graph
 
 
+class GraphAnalysis(object):
+    """A graph together with the structures derived from it which are used
+    by the rules of homotopy_type, each one computed the first time it is
+    needed, so that it is computed once for the graph"""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._neighborhoods = {}
+
+    @classmethod
+    def of(cls, graph):
+        """Returns graph if it is already a GraphAnalysis, a new
+        GraphAnalysis of graph otherwise"""
+        return graph if isinstance(graph, GraphAnalysis) else cls(graph)
+
+    @cached_property
+    def simplified(self):
+        """The analysis of simplify_ht(graph)"""
+        return GraphAnalysis(simplify_ht(self.graph))
+
+    @cached_property
+    def integer(self):
+        """The analysis of the graph with vertices relabeled 0, 1, ..."""
+        if list(self.graph) == list(range(self.graph.order())):
+            return self
+        return GraphAnalysis(nx.convert_node_labels_to_integers(self.graph))
+
+    @cached_property
+    def complement(self):
+        """The analysis of the complement of the graph"""
+        return GraphAnalysis(nx.complement(self.graph))
+
+    @cached_property
+    def components(self):
+        """The connected components of the graph, as graphs"""
+        return [self.graph.subgraph(c).copy()
+                for c in nx.connected_components(self.graph)]
+
+    @cached_property
+    def is_connected(self):
+        return nx.is_connected(self.graph)
+
+    @cached_property
+    def clique_complex(self):
+        return clique_complex(self.graph)
+
+    @cached_property
+    def facets(self):
+        """The facets of the clique complex"""
+        return self.clique_complex.facet_set
+
+    @cached_property
+    def bit_complex(self):
+        """The clique complex as a BitComplex"""
+        return BitComplex.from_facets(self.facets)
+
+    @cached_property
+    def blocks(self):
+        """The vertex sets of the blocks of the graph"""
+        return find_blocks(self.graph)
+
+    @cached_property
+    def cut_vertices(self):
+        """The cutpoints of the graph, [] if it is not connected"""
+        if self.is_connected:
+            return _cut_vertices(self.graph, self.blocks)
+        return []
+
+    def neighborhood(self, vertex):
+        """Returns the subgraph induced by the neighbors of vertex"""
+        if vertex not in self._neighborhoods:
+            self._neighborhoods[vertex] = open_neighborhood(self.graph,
+                                                            vertex)
+        return self._neighborhoods[vertex]
+
+
 def _read_dong(dong):
-    """Converts the set given by dong_matching into a TeX string"""
+    """Converts the set given by dong_matching into a HomotopyType"""
     n_critical = len(dong)
     if n_critical == 0:
-        return (True, "Contractible")
+        return (True, CONTRACTIBLE)
     else:
         list_dong = list(dong)
         dimension = len(list_dong[0])
-        if n_critical == 1:
-            return (True, f"\\(S^{ {dimension-1} }\\)")
-        else:
-            for simp in list_dong:
-                if len(simp) != dimension:
-                    return (False, dong)
-            return (True, f"\\(\\vee_{ {n_critical} }S^{ {dimension-1} }\\)")
+        for simp in list_dong:
+            if len(simp) != dimension:
+                return (False, dong)
+        return (True, HomotopyType.sphere(dimension-1, n_critical))
 
 
 def read_betti_numbers(bettis):
-    if sum(bettis) == 0:
-        return "Contractible"
-    betti = "\\("
-    for index, betti_number in enumerate(bettis):
-        if betti_number != 0:
-            if betti_number == 1:
-                betti = betti + f"S^{ {index} }"
-            else:
-                betti = betti + f"\\vee_{ {betti_number} }S^{ {index} }"
-            betti = betti + "\\vee "
-    return betti[:-5] + "\\)"
+    """Returns the wedge of spheres with the given reduced Betti numbers"""
+    return HomotopyType(bettis)
+
+
+HT_CACHE = None
+MATCHING = MatchingStrategy()
+STATS = None
+BACKEND = "pycliques"
+ITERATIONS = 0
+CLIQUE_BOUND = 23
+DECIDED_BY = None
+TIME_LIMIT = None
+HARD_TIME_LIMIT = None
+MEMORY_BASE = None
+MEMORY_LIMIT = None
+HARD_MEMORY_LIMIT = None
+K_CLASSES = None
+BATCH_SIZE = 512
+
+
+class BudgetExceeded(Exception):
+    """Raised when a graph takes longer than its time budget"""
+
+
+BUDGET_ERRORS = {BudgetExceeded: "time budget exceeded",
+                 MemoryError: "memory budget exceeded",
+                 RecursionError: "recursion limit exceeded"}
+
+
+def configure_backend(name="pycliques"):
+    """Sets the code used for cliques, clique graphs, paring and the Helly
+    test: "pycliques", or "bitmask" for BitGraph, which is used on graphs
+    with at most MAX_ORDER vertices"""
+    global BACKEND
+    if name not in ("pycliques", "bitmask"):
+        raise ValueError(f"Unknown backend {name}")
+    BACKEND = name
+
+
+def configure_cache(maxsize, path=None):
+    """Sets up the cache used by homotopy_type. maxsize is the number of
+    entries kept in memory (0 disables the cache) and path is an optional
+    SQLite file shared between runs and processes"""
+    global HT_CACHE
+    HT_CACHE = GraphCache(maxsize, path) if maxsize > 0 else None
+
+
+def configure_matching(seed=0, attempts=5):
+    """Sets up the strategy used when Dong's matching with the default
+    order fails: attempts vertex orders, with shuffles seeded by seed"""
+    global MATCHING
+    MATCHING = MatchingStrategy(seed, attempts)
+
+
+def configure_profiling(enabled, trace=False):
+    """Starts (or stops, if enabled is False) recording statistics of the
+    rules of homotopy_type, keeping every call if trace is True"""
+    global STATS
+    STATS = RuleStats(trace) if enabled else None
+
+
+def configure_rules(names=None):
+    """Sets the rules tried by homotopy_type, in order, by their names in
+    ALL_RULES. The last rule of ALL_RULES always decides, so it is kept at
+    the end. None restores every rule"""
+    global RULES
+    if names is None:
+        names = [name for name, rule in ALL_RULES]
+    rules = dict(ALL_RULES)
+    for name in names:
+        if name not in rules:
+            raise ValueError(f"Unknown rule {name}")
+    last = ALL_RULES[-1][0]
+    RULES = [(name, rules[name]) for name in names if name != last]
+    RULES.append(ALL_RULES[-1])
+
+
+def configure_iteration(levels=0, bound=23):
+    """Makes main() compute the homotopy types of levels iterated clique
+    graphs, built while they have at most bound vertices. levels 0 makes
+    it compare G and K(G) instead"""
+    global ITERATIONS, CLIQUE_BOUND
+    ITERATIONS = levels
+    CLIQUE_BOUND = bound
+
+
+def configure_dedup(maxsize):
+    """Keeps the results of maxsize isomorphism classes of the graphs
+    p(K(p(G))), which many graphs G share, so graph_record computes them
+    once per class (0 disables it)"""
+    global K_CLASSES
+    K_CLASSES = GraphCache(maxsize) if maxsize > 0 else None
+
+
+def take_dedup_counts():
+    """Returns the hits and misses of the table of configure_dedup since
+    the last call, keyed by "pkg"."""
+    if K_CLASSES is None:
+        return {}
+    counts = {"pkg": [K_CLASSES.hits, K_CLASSES.misses]}
+    K_CLASSES.hits = K_CLASSES.misses = 0
+    return counts
+
+
+def configure_budgets(time_limit=None, hard_time_limit=None,
+                      memory_limit=None, hard_memory_limit=None):
+    """Sets the seconds a graph may take before it is deferred to the hard
+    queue, and the seconds it may take there (None for no limit).
+    memory_limit and hard_memory_limit are the numbers of megabytes the
+    process may allocate on top of what it uses now, outside and inside
+    escalated(), enforced through RLIMIT_AS"""
+    global TIME_LIMIT, HARD_TIME_LIMIT, MEMORY_BASE, MEMORY_LIMIT
+    global HARD_MEMORY_LIMIT
+    TIME_LIMIT = time_limit
+    HARD_TIME_LIMIT = hard_time_limit
+    MEMORY_LIMIT = memory_limit
+    HARD_MEMORY_LIMIT = hard_memory_limit
+    if memory_limit or hard_memory_limit:
+        with open("/proc/self/statm", encoding="utf8") as the_file:
+            pages = int(the_file.read().split()[0])
+        MEMORY_BASE = pages * resource.getpagesize()
+    set_memory_limit(memory_limit)
+
+
+def set_memory_limit(megabytes):
+    """Lets the process allocate megabytes on top of what it used when
+    configure_budgets was called (None for no limit)"""
+    if MEMORY_BASE is None:
+        return
+    maximum = resource.getrlimit(resource.RLIMIT_AS)[1]
+    if megabytes:
+        limit = MEMORY_BASE + megabytes * 2**20
+        if maximum != resource.RLIM_INFINITY:
+            limit = min(limit, maximum)
+    else:
+        limit = maximum
+    resource.setrlimit(resource.RLIMIT_AS, (limit, maximum))
 
 
-def _shuff(lista):
-    return random.sample(list(lista), len(lista))
+def configure(options):
+    """Sets up the current process from the command line options"""
+    configure_cache(options.cache_size, options.cache_db)
+    configure_matching(options.seed, options.attempts)
+    configure_profiling(options.profile is not None or
+                        options.trace is not None,
+                        options.trace is not None)
+    configure_rules(options.rules.split(",") if options.rules else None)
+    configure_backend(options.backend)
+    configure_iteration(options.iterate, options.clique_bound)
+    configure_budgets(options.time_limit, options.hard_time_limit,
+                      options.memory_limit, options.hard_memory_limit)
+    configure_dedup(options.dedup_size)
 
 
 def homotopy_type(graph):
     """Attempts to get a homotopy type using Dong's matching and vertex
-    decomposability"""
+    decomposability. Isomorphic graphs are only computed once if the
+    cache is configured. Afterwards DECIDED_BY is the name of the rule
+    which gave the type, or one of "cache" and "trivial"."""
+    global DECIDED_BY
+    if HT_CACHE is None or graph.order() <= 1:
+        return _homotopy_type(graph)
+    encoded = HT_CACHE.get(graph)
+    if encoded is not None:
+        DECIDED_BY = "cache"
+        return HomotopyType.decode(encoded)
+    h_type = _homotopy_type(graph)
+    HT_CACHE.put(graph, h_type.encode())
+    return h_type
+
+
+def _homotopy_type(graph):
+    global DECIDED_BY
     if graph.order() == 1:
-        return "Contractible"
-    graph = simplify_ht(graph)
-    disconnected_complement = h_type_as_join_complement(graph)
-    if disconnected_complement:
-        return disconnected_complement
-    star_c = h_type_using_star_cluster(graph)
-    if star_c:
-        return star_c
-    spec_n = h_type_by_special_neigh(graph)
-    if spec_n:
-        return spec_n
-    spec_e = h_type_by_special_edges(graph)
-    if spec_e:
-        return spec_e
-    cut_p = h_type_by_cutpoints(graph)
-    if cut_p:
-        return cut_p
-    c_complex = clique_complex(graph)
-    dong1 = c_complex.dong_matching()
-    if _read_dong(dong1)[0]:
-        return _read_dong(dong1)[1]
-    s_ht = nx.convert_node_labels_to_integers(simplify_ht(graph))
-    c_complex2 = clique_complex(s_ht)
-    dong2 = c_complex2.dong_matching()
-    if _read_dong(dong2)[0]:
-        return _read_dong(dong2)[1]
-    attempts = 0
-    while attempts < 5:
-        attempts = attempts + 1
-        dong3 = c_complex2.dong_matching(order_function=_shuff)
-        if _read_dong(dong3)[0]:
-            return _read_dong(dong3)[1]
-    return homotopy_type_s_c(c_complex)
+        DECIDED_BY = "trivial"
+        return CONTRACTIBLE
+    analysis = GraphAnalysis(simplify_ht(graph))
+    if STATS is not None:
+        return _profiled_rules(analysis)
+    for name, rule in RULES:
+        h_type = rule(analysis)
+        if h_type:
+            DECIDED_BY = name
+            return h_type
+
+
+def _profiled_rules(analysis):
+    """Tries the rules like _homotopy_type, recording them in STATS"""
+    global DECIDED_BY
+    STATS.depth = STATS.depth + 1
+    try:
+        for name, rule in RULES:
+            start_time = timeit.default_timer()
+            h_type = rule(analysis)
+            STATS.record(name, h_type, timeit.default_timer()-start_time)
+            if h_type:
+                DECIDED_BY = name
+                return h_type
+    finally:
+        STATS.depth = STATS.depth - 1
+
+
+def screened_type(graph, invariants, number):
+    """Returns the homotopy type of graph read off from the invariants
+    given by screening.screen, where graph is the one numbered number, or
+    None if they do not settle it. Graphs whose complement is not
+    connected are joins of the graphs induced by its components, and the
+    connected ones among those which are not settled in turn go through
+    homotopy_type.
+
+    A triangle-free graph is settled only if it is connected or a forest,
+    since disjoint cycles are not a wedge of spheres:
+
+    >>> two_squares = nx.disjoint_union(nx.cycle_graph(4), nx.cycle_graph(4))
+    >>> rows = BitGraph.from_networkx(two_squares).rows
+    >>> screened_type(two_squares, screening.screen([rows]), 0) is None
+    True
+    """
+    order = int(invariants["order"][number])
+    if order == 0:
+        return None
+    if invariants["pared_order"][number] == 1:
+        return CONTRACTIBLE
+    faces = invariants.get("f_vector")
+    if faces is not None and faces[number, 2:].sum() == 0:
+        components = int(invariants["components"][number])
+        edges = int(faces[number, 1]) if faces.shape[1] > 1 else 0
+        if components == 1 or edges == order - components:
+            return HomotopyType([components - 1, edges - order + components])
+        return None
+    if invariants["complement_components"][number] == 1:
+        return None
+    labels = list(graph)
+    h_type = None
+    for mask in sorted({int(m) for m
+                        in invariants["complement_reach"][number][:order]}):
+        part = graph.subgraph(labels[b.bit_length()-1]
+                              for b in bits(mask)).copy()
+        part_type = screened_type(
+            part, screening.screen([BitGraph.from_networkx(part).rows]), 0)
+        if part_type is None and nx.is_connected(part):
+            part_type = homotopy_type(part)
+        if part_type is None or not part_type.determined:
+            return None
+        h_type = part_type if h_type is None else h_type.join(part_type)
+    return h_type
+
+
+def _batch_types(batch):
+    """Returns the homotopy types of a list of (graph, adjacency bitmasks)
+    pairs, where the bitmasks are None for graphs too large to screen"""
+    small = [number for number, (graph, rows) in enumerate(batch)
+             if rows is not None]
+    invariants = None
+    if small:
+        try:
+            invariants = screening.screen([batch[number][1]
+                                           for number in small])
+        except ImportError:
+            small = []
+    types = [None] * len(batch)
+    for position, number in enumerate(small):
+        types[number] = screened_type(batch[number][0], invariants, position)
+    return [h_type if h_type is not None else homotopy_type(graph)
+            for h_type, (graph, rows) in zip(types, batch)]
+
+
+def homotopy_types(graphs):
+    """Returns the list of homotopy types of graphs, an iterable of
+    networkx graphs or the name of a graph6 file, in order.
+
+    The graphs are screened in batches of BATCH_SIZE by screening.screen,
+    if numpy is installed, and only those whose type is not read off
+    from the invariants go through homotopy_type"""
+    if isinstance(graphs, str):
+        pairs = ((graph6.to_networkx(rows),
+                  rows if len(rows) <= MAX_ORDER else None) for rows
+                 in (graph6.decode(line) for index, line, offset
+                     in graph6.read_lines(graphs)))
+    else:
+        pairs = ((graph, BitGraph.from_networkx(graph).rows
+                  if graph.order() <= MAX_ORDER else None)
+                 for graph in graphs)
+    types = []
+    batch = []
+    for pair in pairs:
+        batch.append(pair)
+        if len(batch) == BATCH_SIZE:
+            types.extend(_batch_types(batch))
+            batch = []
+    types.extend(_batch_types(batch))
+    return types
+
+
+def h_type_by_dong(graph):
+    """Returns the homotopy type given by Dong's matching with the default
+    order, or False if its critical cells have several dimensions"""
+    dong = GraphAnalysis.of(graph).clique_complex.dong_matching()
+    return _read_dong(dong)[1] if _read_dong(dong)[0] else False
+
+
+def h_type_by_dong_simplified(graph):
+    """Like h_type_by_dong, on the simplified graph with integer labels"""
+    return h_type_by_dong(GraphAnalysis.of(graph).simplified.integer)
+
+
+def h_type_by_matching_strategy(graph):
+    """Like h_type_by_dong_simplified, trying the vertex orders of the
+    matching strategy"""
+    analysis = GraphAnalysis.of(graph).simplified.integer
+    dong = MATCHING.match(analysis.clique_complex)
+    if dong is not None and _read_dong(dong)[0]:
+        return _read_dong(dong)[1]
+    return False
+
+
+def h_type_by_clique_complex(graph):
+    """Returns the homotopy type given by homotopy_type_s_c, which may be
+    undetermined"""
+    return homotopy_type_s_c(GraphAnalysis.of(graph).clique_complex)
+
+
+def _special_vertex(b_complex, vertices):
+    """Returns the mask of the first of vertices whose link in b_complex
+    has dimension 0, or None"""
+    for vertex in vertices:
+        if vertex in b_complex.index:
+            mask = b_complex.to_mask([vertex])
+            if b_complex.link(mask).dimension() == 0:
+                return mask
+    return None
 
 
 def special_vertex_in_s_c(s_c):
-    for vertex in s_c.vertex_set:
-        if s_c.link(vertex).dimension() == 0:
-            return vertex
+    b_complex = BitComplex.from_complex(s_c)
+    mask = _special_vertex(b_complex, s_c.vertex_set)
+    if mask is not None:
+        return b_complex.labels[mask.bit_length()-1]
     return None
 
 
 def h_type_s_c_by_special_vertex(s_c):
     s_c = collapse(s_c)
-    vertex = special_vertex_in_s_c(s_c)
-    if vertex is not None:
-        s_c2 = s_c.deletion(vertex)
+    b_complex = BitComplex.from_complex(s_c)
+    mask = _special_vertex(b_complex, s_c.vertex_set)
+    if mask is not None:
+        s_c2 = b_complex.deletion(mask).to_complex()
         h_type = homotopy_type_s_c(s_c2)
-        s_neigh = len(s_c.link(vertex).vertex_set)
-        return suspend_string_with_s1s(h_type, s_neigh)
+        s_neigh = bin(b_complex.link(mask).vertex_mask()).count("1")
+        return h_type.wedge(HomotopyType.sphere(1, s_neigh-1))
     return False
 
 
 def suspend_string_with_s1s(h_type, s_neigh):
-    if h_type == "Contractible":
-        if s_neigh == 2:
-            return "\\(S^{1}\\)"
-        else:
-            return f"\\(\\vee_{ {s_neigh-1} }S^{ {1} }\\)"
-    else:
-        h_type = h_type[2:]
-        if "S^{1}" in h_type:
-            pat = r"\_\{(\d+)\}S\^\{1\}"
-            m = re.search(pat, h_type)
-            if m is None:
-                # string contains only one copy of S^1
-                return f"\\(\\vee_{ {s_neigh} }" + str(h_type)
-            inds = m.span(1)
-            newcadena = h_type[:inds[0]]+str(int(h_type[inds[0]: inds[1]])+s_neigh-1)+h_type[inds[1]:]
-            return "\\("+newcadena
-        if s_neigh == 2:
-            return "\\(S^{1}\\vee " + str(h_type)
-        return f"\\(\\vee_{ {s_neigh-1} }S^{ {1} }\\vee " + str(h_type)
+    """Returns the TeX string of the wedge of the type written h_type by
+    to_tex with s_neigh-1 circles"""
+    return str(HomotopyType.from_tex(h_type).wedge(
+        HomotopyType.sphere(1, s_neigh - 1)))
+
+
+def h_type_by_morse_matching(morse):
+    """Returns the homotopy type given by a MorseMatching whose critical
+    faces other than a vertex have a single dimension, None otherwise"""
+    dimension = morse.sphere_dimension()
+    if dimension is None:
+        return None
+    if dimension == -1:
+        return CONTRACTIBLE
+    return HomotopyType.sphere(dimension, len(morse.critical) - 1)
+
+
+def h_type_by_homology(morse, bettis):
+    """Returns the homotopy type of a complex with a MorseMatching whose
+    critical faces are a vertex and faces of dimensions 2 to d, if its
+    reduced integral homology vanishes below d, None otherwise.
+
+    Such a complex is simply connected, hence (d-1)-connected by the
+    Hurewicz theorem, and it is homotopy equivalent to a CW complex of
+    dimension d, so it is a wedge of d-spheres, as many as the Euler
+    characteristic gives. The Betti numbers over GF(2), bettis, bound
+    the integral ones, so the latter are only computed if the former
+    vanish below d"""
+    counts = morse.critical_dimensions()
+    if len(counts) < 3 or counts[0] != 1 or counts[1] > 0:
+        return None
+    top = len(counts) - 1
+    if any(bettis[:top]):
+        return None
+    if any(rank or torsion for rank, torsion
+           in morse.integral_homology(top - 1)):
+        return None
+    return HomotopyType.sphere(top, (-1) ** top *
+                               morse.euler_characteristic())
 
 
 def homotopy_type_s_c(s_c):
@@ -149,40 +585,28 @@ def homotopy_type_s_c(s_c):
     dong1 = c_c.dong_matching()
     if _read_dong(dong1)[0]:
         return _read_dong(dong1)[1]
-    attempts = 0
-    while attempts < 5:
-        attempts = attempts + 1
-        dong3 = c_c.dong_matching(order_function=_shuff)
-        if _read_dong(dong3)[0]:
-            return _read_dong(dong3)[1]
+    morse = MorseMatching.from_complex(c_c)
+    h_type = h_type_by_morse_matching(morse)
+    if h_type is not None:
+        return h_type
+    dong3 = MATCHING.match(c_c)
+    if dong3 is not None and _read_dong(dong3)[0]:
+        return _read_dong(dong3)[1]
     h_type = h_type_s_c_by_special_vertex(s_c)
     if h_type:
         return h_type
+    bettis = morse.betti_numbers()
+    h_type = h_type_by_homology(morse, bettis)
+    if h_type is not None:
+        return h_type
     if is_vertex_decomposable(c_c):
-        return read_betti_numbers(betti_numbers_c(c_c))
-    return betti_numbers_c(c_c)
-
-
-def dimension_sc(s_complex):
-    """Returns the dimension of a simplicial complex"""
-    dims = [len(f) for f in s_complex.face_set]
-    dims.sort()
-    return dims[-1] - 1
+        return read_betti_numbers(bettis)
+    return HomotopyType.undetermined(bettis)
 
 
 def betti_numbers(graph):
     """Computes the betti numbers of the complex of completes of a graph"""
-    def simplify_list(bettis):
-        simplified = bettis
-        while len(simplified) > 0 and simplified[-1] == 0:
-            del simplified[-1]
-        return simplified
-    the_simplices = [tuple(c) for c in nx.find_cliques(graph)]
-    the_complex = mogutda.SimplicialComplex(simplices=the_simplices)
-    dim = dimension_sc(the_complex)
-    numbers = [the_complex.betti_number(i) for i in range(dim+1)]
-    numbers[0] = numbers[0] - 1  # reduced betti number
-    return simplify_list(numbers)
+    return betti_vector(maximal_cliques(graph))
 
 
 def max_degree(graph):
@@ -193,90 +617,68 @@ def max_degree(graph):
 
 def is_shedding_vertex(the_complex, vertex):
     """Returns True if vertex is a shedding vertex of the complex"""
-    link = the_complex.link(vertex)
-    deletion = the_complex.deletion(vertex)
-    facets_deletion = deletion.facet_set
-    faces_link = link.facet_set
-    intersection = facets_deletion & faces_link
-    return len(intersection) == 0
+    return decomposability.is_shedding_vertex(the_complex.facet_set, vertex)
 
 
-def is_vertex_decomposable(the_complex):
-    """Returns True if the complex is vertex decomposable"""
-    if len(the_complex.facet_set) == 1:
-        return True
-    else:
-        for vertex in the_complex.vertex_set:
-            if (is_shedding_vertex(the_complex, vertex) and
-                is_vertex_decomposable(the_complex.link(vertex)) and
-                    is_vertex_decomposable(the_complex.deletion(vertex))):
-                return True
-        return False
+def vertex_decomposition(the_complex):
+    """Returns the shedding vertices of a vertex decomposition of the
+    complex, with the decompositions of their links, or None if the
+    complex is not vertex decomposable"""
+    return decomposability.vertex_decomposition(the_complex.facet_set)
 
 
-def _facets_containing_simplex(simplicial_complex, simplex):
-    facets = simplicial_complex.facet_set
-    return len([facet for facet in facets if simplex.issubset(facet)])
+def is_vertex_decomposable(the_complex):
+    """Returns True if the complex is vertex decomposable"""
+    return vertex_decomposition(the_complex) is not None
 
 
 def is_free_face(simplicial_complex, simplex):
     """Returns True if simplex is a free face of simplicial_complex"""
-    return (not(simplex in simplicial_complex.facet_set) and
-            _facets_containing_simplex(simplicial_complex, simplex) == 1)
+    b_complex = BitComplex.from_complex(simplicial_complex)
+    return b_complex.is_free_face(b_complex.to_mask(simplex))
 
 
 def remove_simplex(simplicial_complex, simplex):
     """Returns the simplicial complex obtained by removing a simplex"""
-    facet_containing = [f for f in simplicial_complex.facet_set
-                        if simplex.issubset(f)][0]
-    other_facets = simplicial_complex.facet_set - {facet_containing}
-    good_facets = other_facets
-    for vertex in simplex:
-        good = True
-        for g_facet in other_facets:
-            if (facet_containing-{vertex}).issubset(g_facet):
-                good = False
-                break
-        if good:
-            good_facets = good_facets.union({facet_containing-{vertex}})
-    vertices = set.union(*(set(s) for s in good_facets))
-    return SimplicialComplex(vertices, facet_set=good_facets)
+    b_complex = BitComplex.from_complex(simplicial_complex)
+    b_complex.remove_simplex(b_complex.to_mask(simplex))
+    return b_complex.to_complex()
 
 
 def has_free_face(simplicial_complex):
     """Returns a free face of simplicial_complex if it exists, None otherwise"""
-    for face in simplicial_complex.all_simplices():
-        if is_free_face(simplicial_complex, face):
-            return face
+    b_complex = BitComplex.from_complex(simplicial_complex)
+    if len(b_complex.facets) == 1:
+        return Simplex()
+    for facet in b_complex.facets:
+        free = b_complex.free_face(facet)
+        if free is not None:
+            return b_complex.to_simplex(free)
     return None
 
 
 def collapse(simplicial_complex, verbose=False):
-    """Collapses simplicial_complex"""
-    s_c = simplicial_complex
-    all_done = False
-    while not all_done:
-        if len(s_c.vertex_set) in {0, 1}:
-            return s_c
-        free_face = has_free_face(s_c)
-        if free_face is None:
-            all_done = True
-        elif len(free_face) == 0:
-            vertex = list(s_c.vertex_set)[0]
-            return SimplicialComplex(vertex_set={vertex},
-                                     facet_set={Simplex({vertex})})
-        else:
-            if verbose:
-                print(f"Free face: {free_face}")
-            s_c = remove_simplex(s_c, free_face)
-    return s_c
-
-
-def _is_special_cutpoint(graph, vertex):
-    """Returns True if vertex is a special cutpoint of graph"""
-    neigh = open_neighborhood(graph, vertex)
-    if neigh.size() == 0:
-        for n_vertex in neigh:
+    """Collapses simplicial_complex, which may also be a BitComplex, which
+    is then collapsed in place. Returns a SimplicialComplex"""
+    if isinstance(simplicial_complex, BitComplex):
+        b_complex = simplicial_complex
+        if len(b_complex.incidence) <= 1:
+            return b_complex.to_complex()
+    elif len(simplicial_complex.vertex_set) in {0, 1}:
+        return simplicial_complex
+    else:
+        b_complex = BitComplex.from_complex(simplicial_complex)
+    return b_complex.collapse(verbose).to_complex()
+
+
+def _is_special_cutpoint(graph, vertex, triangles=None):
+    """Returns True if vertex is a special cutpoint of graph. triangles is
+    the number of edges in the open neighborhood of vertex, computed if
+    not given"""
+    if triangles is None:
+        triangles = nx.triangles(graph, vertex)
+    if triangles == 0:
+        for n_vertex in graph[vertex]:
             if graph.degree[n_vertex] == 1:
                 return False
         return True
@@ -285,8 +687,9 @@ def _is_special_cutpoint(graph, vertex):
 
 def find_special_cutpoint(graph):
     """Returns a special cutpoint of graph if it exists, None otherwise"""
+    triangles = nx.triangles(graph)
     for vertex in graph:
-        if _is_special_cutpoint(graph, vertex):
+        if _is_special_cutpoint(graph, vertex, triangles[vertex]):
             return vertex
     return None
 
@@ -296,60 +699,30 @@ def h_type_clique_graph_cutpoint(graph, vertex):
     h_graph = graph.subgraph(set(graph.nodes())-{vertex})
     k_h_type = homotopy_type(k(h_graph))
     s_neigh = open_neighborhood(graph, vertex).order()
-    if k_h_type == "Contractible":
-        if s_neigh == 2:
-            return "\\(S^{1}\\)"
-        else:
-            return f"\\(\\vee_{ {s_neigh-1} }S^{ {1} }\\)"
-    else:
-        k_h_type = k_h_type[2:]
-        if "S^{1}" in k_h_type:
-            pat = r"\_\{(\d+)\}S\^\{1\}"
-            m = re.search(pat, k_h_type)
-            if m is None:
-                # K(G-v) contains only one copy of S^1
-                return f"\\(\\vee_{ {s_neigh} }" + str(k_h_type)
-            inds = m.span(1)
-            newcadena = k_h_type[:inds[0]]+str(int(k_h_type[inds[0]: inds[1]])+s_neigh-1)+k_h_type[inds[1]:]
-            return "\\("+newcadena
-        if s_neigh == 2:
-            return "\\(S^{1}\\vee " + str(k_h_type)
-        return f"\\(\\vee_{ {s_neigh-1} }S^{ {1} }\\vee " + str(k_h_type)
+    return k_h_type.wedge(HomotopyType.sphere(1, s_neigh-1))
 
 
 def star(s_complex, vertex):
-    new_facets = {f for f in s_complex.facet_set if vertex in f}
-    vertices = set.union(*(set(s) for s in new_facets))
-    return SimplicialComplex(vertices, facet_set=new_facets)
+    b_complex = BitComplex.from_complex(s_complex)
+    return b_complex.star(b_complex.to_mask([vertex])).to_complex()
 
 
 def star_cluster(s_complex, simplex):
-    new_facets = set()
-    for vertex in simplex:
-        new_facets = new_facets.union({f for f in s_complex.facet_set
-                                       if vertex in f})
-    vertices = set.union(*(set(s) for s in new_facets))
-    return SimplicialComplex(vertices, facet_set=new_facets)
+    b_complex = BitComplex.from_complex(s_complex)
+    return b_complex.star_cluster(b_complex.to_mask(simplex)).to_complex()
 
 
 def intersection_complex(s_complex1, s_complex2):
-    vertices = {x for x in s_complex1.vertex_set if s_complex2.function({x})}
-
-    def _new_function(s):
-        return s_complex1.function(s) and s_complex2.function(s)
-    return SimplicialComplex(vertices, function=_new_function)
+    """Returns the complex of the simplices of both complexes, given by its
+    facets"""
+    b_complex = BitComplex.from_complex(s_complex1)
+    other = b_complex.view(
+        {b_complex.to_mask(v for v in f if v in b_complex.index)
+         for f in s_complex2.facet_set})
+    return b_complex.intersection(other).to_complex()
 
 
 def h_type_as_suspension(graph):
-    def increase_numbers(line, n):
-        pattern = r"S\^{(\d+)}"
-
-        def repl(match):
-            number = int(match.group(1))
-            increased_number = number + n
-            return f"S^{ {increased_number} }"
-        updated_line = re.sub(pattern, repl, line)
-        return updated_line
     c_graph = nx.complement(graph)
     comps = [c_graph.subgraph(c).copy() for c in nx.connected_components(c_graph)]
     compsK2 = [s for s in comps if s.order() == 2]
@@ -357,70 +730,67 @@ def h_type_as_suspension(graph):
         return None
     others = [s for s in comps if s.order() != 2]
     subg = nx.subgraph(graph, set.union(*(set(s) for s in others)))
-    return increase_numbers(homotopy_type(subg), len(compsK2))
+    return homotopy_type(subg).suspend(len(compsK2))
 
 
 def betti_numbers_c(simplicial_complex):
-    """Computes the betti numbers of the complex of completes of a graph"""
-    def simplify_list(bettis):
-        simplified = bettis
-        while len(simplified) > 0 and simplified[-1] == 0:
-            del simplified[-1]
-        return simplified
-    the_simplices = [tuple(c) for c in simplicial_complex.facet_set]
-    the_complex = mogutda.SimplicialComplex(simplices=the_simplices)
-    dim = dimension_sc(the_complex)
-    numbers = [the_complex.betti_number(i) for i in range(dim+1)]
-    numbers[0] = numbers[0] - 1  # reduced betti number
-    return simplify_list(numbers)
+    """Computes the reduced betti numbers of a simplicial complex"""
+    return betti_vector(simplicial_complex.facet_set)
 
 
 def h_type_using_star_cluster(graph):
-    if graph.order() == 1:
-        return "Contractible"
-    graph = nx.convert_node_labels_to_integers(graph)
-    c_graph = nx.complement(graph)
-    verts = [i for i in c_graph.nodes() if open_neighborhood(c_graph, i).size() == 0]
+    analysis = GraphAnalysis.of(graph).integer
+    if analysis.graph.order() == 1:
+        return CONTRACTIBLE
+    c_analysis = analysis.complement
+    c_graph = c_analysis.graph
+    verts = [i for i in c_graph.nodes() if c_analysis.neighborhood(i).size() == 0]
     if len(verts) == 0:
         return False
     else:
         vertex = verts[0]
-        IG = clique_complex(graph)
-        ST = star(IG, vertex)
-        SC = star_cluster(IG, c_graph[vertex])
-        int_c = intersection_complex(ST, SC)
+        IG = analysis.bit_complex
+        ST = IG.star(IG.to_mask([vertex]))
+        SC = IG.star_cluster(IG.to_mask(c_graph[vertex]))
+        int_c = ST.intersection(SC)
         csc = collapse(int_c)
         h_type = homotopy_type_s_c(csc)
-        if h_type:
-            return read_betti_numbers([0]+betti_numbers_c(csc))
+        if h_type.determined:
+            return h_type.suspend()
         if is_vertex_decomposable(csc):
             return read_betti_numbers([0]+betti_numbers_c(csc))
         return False
 
 
-def list_to_polynomial(lst):
-    x = symbols('x')
-    terms = [i * x**p for p, i in enumerate(lst)]
-    polynomial = Poly(sum(terms), x)
-    return polynomial
+def add_betti_numbers(lists):
+    """Adds lists of Betti numbers, as for a wedge of spaces"""
+    total = [0]*max([len(bettis) for bettis in lists], default=0)
+    for bettis in lists:
+        for index, betti_number in enumerate(bettis):
+            total[index] = total[index] + betti_number
+    return total
 
 
-def polynomial_to_list(polynomial):
-    coefficients = polynomial.all_coeffs()
-    coefficients.reverse()
-    return coefficients
+def multiply_betti_numbers(lists):
+    """Multiplies lists of Betti numbers as the coefficient lists of
+    polynomials"""
+    product = [1]
+    for bettis in lists:
+        new_product = [0]*(len(product)+len(bettis)-1)
+        for i, a in enumerate(product):
+            for j, b in enumerate(bettis):
+                new_product[i+j] = new_product[i+j] + a*b
+        product = new_product
+    return product
 
 
 def h_type_as_join_complement(graph):
-    x = symbols('x')
-    c_graph = nx.complement(nx.convert_node_labels_to_integers(graph))
-    comps = [c_graph.subgraph(c).copy() for c in nx.connected_components(c_graph)]
+    comps = GraphAnalysis.of(graph).integer.complement.components
     if len(comps) > 1:
         compls = [clique_complex(nx.complement(s)) for s in comps]
         if all([is_vertex_decomposable(collapse(c)) for c in compls]):
-            pols = [list_to_polynomial(betti_numbers_c(s)) for s in compls]
-            expr_pols = [poly.as_expr() for poly in pols]
-            the_list = [0]*(len(comps)-1)+polynomial_to_list(Poly(Mul(*expr_pols), x))
+            bettis = [betti_numbers_c(s) for s in compls]
+            the_list = [0]*(len(comps)-1)+multiply_betti_numbers(bettis)
             return read_betti_numbers(the_list)
         return False
     return False
@@ -437,7 +807,9 @@ def is_disjoint_union_of_two_completes(graph):
 
 
 def h_type_by_special_neigh(graph):
-    neighs = [(i, open_neighborhood(graph, i)) for i in graph.nodes()]
+    analysis = GraphAnalysis.of(graph)
+    graph = analysis.graph
+    neighs = [(i, analysis.neighborhood(i)) for i in graph.nodes()]
     # twok2 = nx.disjoint_union(nx.complete_graph(2), nx.complete_graph(2))
     # filt = [v for (v, nei) in neighs if nx.is_isomorphic(nei, twok2)]
     filt = [v for (v, nei) in neighs if is_disjoint_union_of_two_completes(nei)]
@@ -446,41 +818,31 @@ def h_type_by_special_neigh(graph):
         v = filt2[0]
         h = graph.subgraph(set(graph.nodes())-{v})
         h_type = homotopy_type(nx.convert_node_labels_to_integers(h))
-        if h_type == "Contractible":
-            return "\\(S^{1}\\)"
-        else:
-            h_type = h_type[2:]
-            if "S^{1}" in h_type:
-                pat = r"\_\{(\d+)\}S\^\{1\}"
-                m = re.search(pat, h_type)
-                if m is None:
-                    # G-v contains only one copy of S^1
-                    return "\\(\\vee_{2}" + str(h_type)
-                inds = m.span(1)
-                newcadena = h_type[:inds[0]]+str(int(h_type[inds[0]: inds[1]])+1)+h_type[inds[1]:]
-                return "\\("+newcadena
-            return "\\(S^{1}\\vee " + str(h_type)
+        return h_type.wedge(HomotopyType.sphere(1))
     return False
 
 
 def is_special_edge(graph, edge):
-    n1 = open_neighborhood(graph, edge[0])
-    n2 = open_neighborhood(graph, edge[1])
+    analysis = GraphAnalysis.of(graph)
+    graph = analysis.graph
+    n1 = analysis.neighborhood(edge[0])
+    n2 = analysis.neighborhood(edge[1])
     inter = set(n1).intersection(set(n2))
     # avoid "threads" between components
     return len(inter) == 0 and graph.degree(edge[0]) > 2 and  graph.degree(edge[1]) > 2
 
 
 def find_special_edges(graph):
-    edges = graph.edges()
-    return [e for e in edges if is_special_edge(graph, e)]
+    analysis = GraphAnalysis.of(graph)
+    edges = analysis.graph.edges()
+    return [e for e in edges if is_special_edge(analysis, e)]
 
 
 def h_type_by_special_edges(graph):
-    x = symbols('x')
-    graph = simplify_ht(graph)
-    if nx.is_connected(graph):
-        sp_edges = find_special_edges(graph)
+    analysis = GraphAnalysis.of(graph).simplified
+    graph = analysis.graph
+    if analysis.is_connected:
+        sp_edges = find_special_edges(analysis)
         if sp_edges:
             c_graph = graph.copy()
             c_graph.remove_edges_from(sp_edges)
@@ -488,10 +850,9 @@ def h_type_by_special_edges(graph):
             if len(comps) == 2:
                 compls = [clique_complex(s) for s in comps]
                 if all([is_vertex_decomposable(collapse(c)) for c in compls]):
-                    pols = [list_to_polynomial(betti_numbers_c(s)) for s in compls]
-                    pols.append(list_to_polynomial([0, len(sp_edges)-1]))
-                    expr_pols = [poly.as_expr() for poly in pols]
-                    the_list = polynomial_to_list(Poly(Add(*expr_pols), x))
+                    bettis = [betti_numbers_c(s) for s in compls]
+                    bettis.append([0, len(sp_edges)-1])
+                    the_list = add_betti_numbers(bettis)
                     return read_betti_numbers(the_list)
             return False
         return False
@@ -499,97 +860,613 @@ def h_type_by_special_edges(graph):
 
 
 def is_cutpoint(graph, vertex):
-    if nx.is_connected(graph):
-        c_graph = graph.copy()
-        c_graph.remove_node(vertex)
-        if not nx.is_connected(c_graph):
-            return True
-    return False
+    return vertex in find_cutpoints(graph)
+
+
+def find_blocks(graph):
+    """Returns the vertex sets of the blocks of graph"""
+    return [set(b) for b in nx.biconnected_components(graph)]
+
+
+def _cut_vertices(graph, blocks):
+    """Returns the vertices of graph in more than one of the blocks"""
+    counts = {}
+    for block in blocks:
+        for vertex in block:
+            counts[vertex] = counts.get(vertex, 0) + 1
+    return [v for v in graph.nodes if counts.get(v, 0) > 1]
 
 
 def find_cutpoints(graph):
-    return [v for v in graph.nodes if is_cutpoint(graph, v)]
+    """Returns the cutpoints of a connected graph, in the order of its
+    vertices, or [] if the graph is not connected"""
+    if nx.is_connected(graph):
+        return _cut_vertices(graph, find_blocks(graph))
+    return []
 
 
 def h_type_by_cutpoints(graph):
-    x = symbols('x')
-    graph = simplify_ht(graph)
-    if nx.is_connected(graph):
-        cutpoints = find_cutpoints(graph)
-        if cutpoints:
-            vertex = cutpoints[0]
-            c_graph = graph.copy()
-            c_graph.remove_node(vertex)
-            comps = [c.union({vertex}) for c in nx.connected_components(c_graph)]
-            comps = [graph.subgraph(c) for c in comps]
+    """The clique complex of a connected graph is the wedge of the clique
+    complexes of its blocks, since every clique lies in a block"""
+    analysis = GraphAnalysis.of(graph).simplified
+    graph = analysis.graph
+    if analysis.is_connected:
+        if analysis.cut_vertices:
+            comps = [graph.subgraph(b) for b in analysis.blocks]
             compls = [clique_complex(s) for s in comps]
             if all([is_vertex_decomposable(collapse(c)) for c in compls]):
-                pols = [list_to_polynomial(betti_numbers_c(s)) for s in compls]
-                expr_pols = [poly.as_expr() for poly in pols]
-                the_list = polynomial_to_list(Poly(Add(*expr_pols), x))
+                bettis = [betti_numbers_c(s) for s in compls]
+                the_list = add_betti_numbers(bettis)
                 return read_betti_numbers(the_list)
             return False
         return False
     return False
 
 
+ALL_RULES = [("join_complement", h_type_as_join_complement),
+             ("star_cluster", h_type_using_star_cluster),
+             ("special_neigh", h_type_by_special_neigh),
+             ("special_edges", h_type_by_special_edges),
+             ("cutpoints", h_type_by_cutpoints),
+             ("dong", h_type_by_dong),
+             ("dong_simplified", h_type_by_dong_simplified),
+             ("matching_strategy", h_type_by_matching_strategy),
+             ("clique_complex", h_type_by_clique_complex)]
+RULES = list(ALL_RULES)
+
+
 HEADING = ("| index | order | max d | Helly | K Helly | HT G | HT KG |\n"
            "|-------+-------+-------+-------+---------+------+-------|\n")
 
 
-def main():
-    """Main function"""
-    parts = args.filename.split('/')
-    results = f"homotopy_types_{parts[-1]}.org"
+def conditions(graph):
+    """Returns True if graph is to be studied by main()"""
+    return (not has_dominated_vertex(graph)
+            and max_degree(graph) >= 5)
 
-    def conditions(graph):
-        return (not has_dominated_vertex(graph)
-                and max_degree(graph) >= 5)
-    i = -1
-    with open(results, 'a', encoding="utf8") as the_file:
-        the_file.write(HEADING)
-        graphs = nx.read_graph6(args.filename)
-        for graph in graphs:
-            i = i+1
-            print("\r", end='')
-            print(f"Currently on graph {i}", end='', flush=True)
-            if conditions(graph):
-                start_time = timeit.default_timer()
-                p_g = p(graph)
-                h_g = homotopy_type(p_g)
-                k_g = k(p_g)
-                if k_g is not None:
-                    pkg = nx.convert_node_labels_to_integers(p(k_g))
-                    c_v = find_special_cutpoint(graph)
-                    if c_v is not None:
-                        hkg = h_type_clique_graph_cutpoint(p_g, c_v)
-                    else:
-                        hkg = homotopy_type(pkg)
-                    is_helly = is_clique_helly(graph)
-                    is_k_helly = is_clique_helly(pkg)
-                    if (not (is_helly and
-                             ("S^{1}" in h_g or "S^{1}" in hkg)
-                             )) and not (
-                                is_k_helly and h_g == hkg and "S^{1}" in h_g):
-                        the_file.write("|" + str(i) +
-                                       "|" + str(p_g.order()) +
-                                       "|" + str(max_degree(graph)) +
-                                       "|" + str(is_helly) +
-                                       "|" + str(is_k_helly) +
-                                       "|" + str(h_g) +
-                                       "|" + str(hkg) +
-                                       "|\n")
+
+def bitmask_conditions(rows):
+    """Returns conditions() of the graph with adjacency bitmasks rows"""
+    return (graph6.max_degree(rows) >= 5
+            and not graph6.has_dominated_vertex(rows))
+
+
+def pared_clique_graph(p_g):
+    """Returns p(k(p_g)) with vertices 0, 1, ..., or None if k(p_g) has
+    more than 23 vertices"""
+    b_graph = bit_graph(p_g)
+    if b_graph is not None:
+        b_kg = b_graph.clique_graph()
+        if b_kg is None:
+            return None
+        return b_kg.pared().relabeled().to_networkx()
+    k_g = k(p_g)
+    if k_g is None:
+        return None
+    return nx.convert_node_labels_to_integers(p(k_g))
+
+
+def _shared(table, graph, compute, *arguments):
+    """Returns compute(*arguments), stored in table for the isomorphism
+    class of graph if table is not None"""
+    if table is None:
+        return compute(*arguments)
+    stored = table.get(graph)
+    if stored is None:
+        stored = (compute(*arguments),)
+        table.put(graph, stored)
+    return stored[0]
+
+
+def _pkg_results(pkg):
+    h_type = homotopy_type(pkg)
+    return h_type, DECIDED_BY, is_clique_helly(pkg)
+
+
+def certainty(*h_types):
+    """Returns "certified" if the homotopy types which are not None are all
+    determined, and "heuristic" if some of them are only known by their
+    Betti numbers, so the results need review"""
+    if all(h_type.determined for h_type in h_types if h_type is not None):
+        return "certified"
+    return "heuristic"
+
+
+def graph_record(index, graph):
+    """Returns the results for graph as a dictionary, with the rules which
+    gave the homotopy types and their certainty, or None if there is
+    nothing to report.
+
+    The homotopy type and the Helly test of p(K(p(graph))) are computed
+    once for every isomorphism class if configure_dedup was called"""
+    p_g = p(graph)
+    h_g = homotopy_type(p_g)
+    record = {"index": index, "order": p_g.order(),
+              "max_degree": max_degree(graph), "helly": is_clique_helly(graph),
+              "k_helly": None, "ht_g": h_g, "rule_g": DECIDED_BY,
+              "ht_kg": None, "rule_kg": None, "note": None}
+    pkg = pared_clique_graph(p_g)
+    if pkg is None:
+        record["note"] = "Clique graph has at least 23 vertices"
+        record["status"] = certainty(h_g)
+        return record
+    c_v = find_special_cutpoint(graph)
+    if c_v is None:
+        hkg, rule_kg, is_k_helly = _shared(K_CLASSES, pkg, _pkg_results, pkg)
+    else:
+        is_k_helly = is_clique_helly(pkg)
+        hkg = h_type_clique_graph_cutpoint(p_g, c_v)
+        rule_kg = "special_cutpoint"
+    record.update(k_helly=is_k_helly, ht_kg=hkg, rule_kg=rule_kg,
+                  status=certainty(h_g, hkg))
+    if (not (record["helly"] and
+             (h_g.has_sphere(1) or hkg.has_sphere(1))
+             )) and not (
+                is_k_helly and h_g == hkg and h_g.has_sphere(1)):
+        return record
+    return None
+
+
+def org_row(record):
+    """Returns the row of the results table for a record of graph_record"""
+    if record["note"] is not None:
+        return f"|{record['index']}|{record['note']}|||||\n"
+    return ("|" + str(record["index"]) +
+            "|" + str(record["order"]) +
+            "|" + str(record["max_degree"]) +
+            "|" + str(record["helly"]) +
+            "|" + str(record["k_helly"]) +
+            "|" + str(record["ht_g"]) +
+            "|" + str(record["ht_kg"]) +
+            "|\n")
+
+
+def graph_row(index, graph):
+    """Returns the row of the results table for graph, or None if there is
+    nothing to report"""
+    record = graph_record(index, graph)
+    return org_row(record) if record is not None else None
+
+
+def iterated_clique_graphs(graph, levels, bound=23):
+    """Returns the graphs p(G), p(K(p(G))), ... obtained applying p and K
+    at most levels times, with vertices 0, 1, ...
+
+    Stops when the next graph is isomorphic to an earlier one, whose
+    position is also returned (None if there is none), or when the next
+    clique graph would have more than bound vertices"""
+    b_graph = BitGraph.from_networkx(graph).pared().relabeled()
+    graphs = []
+    positions = {}
+    while True:
+        n_graph = b_graph.to_networkx()
+        key = graph_key(n_graph)
+        for earlier in positions.get(key, []):
+            if nx.is_isomorphic(graphs[earlier], n_graph):
+                return graphs, earlier
+        positions.setdefault(key, []).append(len(graphs))
+        graphs.append(n_graph)
+        if len(graphs) > levels:
+            return graphs, None
+        b_graph = b_graph.clique_graph(bound)
+        if b_graph is None:
+            return graphs, None
+        b_graph = b_graph.pared().relabeled()
+
+
+def iterated_heading(levels):
+    """Returns the heading of the results table of iterated_row"""
+    columns = ["index", "order"] + [f"HT K^{n}G" for n in range(levels + 1)]
+    columns.append("end")
+    return ("| " + " | ".join(columns) + " |\n" +
+            "|" + "+".join("-" * (len(c) + 2) for c in columns) + "|\n")
+
+
+def iterated_row(index, graph):
+    """Returns the row of the results table of the iterated clique graphs
+    of graph. Once the sequence repeats, the remaining homotopy types are
+    filled in from the period instead of being computed"""
+    graphs, repeat = iterated_clique_graphs(graph, ITERATIONS, CLIQUE_BOUND)
+    h_types = [homotopy_type(g) for g in graphs]
+    if repeat is not None:
+        period = len(graphs) - repeat
+        if period == 1:
+            end = f"stable from {repeat}"
+        else:
+            end = f"period {period} from {repeat}"
+        while len(h_types) <= ITERATIONS:
+            h_types.append(h_types[len(h_types) - period])
+    elif len(graphs) <= ITERATIONS:
+        end = f"K^{len(graphs)}G has more than {CLIQUE_BOUND} vertices"
+    else:
+        end = ""
+    cells = [str(h) for h in h_types]
+    cells += [""] * (ITERATIONS + 1 - len(cells))
+    return ("|" + str(index) +
+            "|" + str(graphs[0].order()) +
+            "|" + "|".join(cells) +
+            "|" + end +
+            "|\n")
+
+
+def graph_results(index, graph):
+    """Returns the row of the results table for graph and its record, which
+    is None in the iterated mode"""
+    if ITERATIONS > 0:
+        return iterated_row(index, graph), None
+    record = graph_record(index, graph)
+    return (org_row(record) if record is not None else None), record
+
+
+def deferred_record(index, error):
+    """Returns the record of a graph which exceeded its budget with error"""
+    record = {"index": index, "order": None, "max_degree": None,
+              "helly": None, "k_helly": None, "ht_g": None, "rule_g": None,
+              "ht_kg": None, "rule_kg": None, "status": None}
+    record["note"] = f"Deferred: {BUDGET_ERRORS[type(error)]}"
+    return record
+
+
+def _alarm(signum, frame):
+    raise BudgetExceeded()
+
+
+def run_with_budget(seconds, function, *arguments):
+    """Returns function(*arguments), raising BudgetExceeded if it takes more
+    than seconds. There is no limit if seconds is None"""
+    if not seconds:
+        return function(*arguments)
+    previous = signal.signal(signal.SIGALRM, _alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        return function(*arguments)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+@contextmanager
+def escalated():
+    """Gives Dong's matching four times as many attempts, Python four
+    times as many recursion levels and the process HARD_MEMORY_LIMIT
+    megabytes within the context"""
+    global MATCHING
+    matching, recursion = MATCHING, sys.getrecursionlimit()
+    MATCHING = MatchingStrategy(matching.seed, 4 * matching.attempts)
+    sys.setrecursionlimit(4 * recursion)
+    set_memory_limit(HARD_MEMORY_LIMIT)
+    try:
+        yield
+    finally:
+        MATCHING = matching
+        sys.setrecursionlimit(recursion)
+        set_memory_limit(MEMORY_LIMIT)
+
+
+def process_chunk(task):
+    """Processes a chunk given by graph6_chunks, as the task (chunk, end
+    offset, hard).
+
+    Returns the list of (index, row, record, time, events) tuples of the
+    chunk, where record is given by graph_record (None in the iterated
+    mode), time is None for graphs rejected by conditions() and events are
+    the rule calls of the graph if they are traced, together with the
+    offset where the chunk ends, the rule statistics of the chunk, the
+    (index, graph6 bytes) pairs of the graphs which exceeded their budget
+    and the dedup hits and misses of the chunk, as in take_dedup_counts().
+
+    If hard is True the chunk comes from the hard queue: graphs get
+    HARD_TIME_LIMIT seconds and escalated() strategies, and the row of a
+    graph which exceeds its budget again says so. Runs in the worker
+    processes."""
+    chunk, end_offset, hard = task
+    limit = HARD_TIME_LIMIT if hard else TIME_LIMIT
+    results = []
+    deferred = []
+    with escalated() if hard else nullcontext():
+        for index, line in chunk:
+            rows = graph6.decode(line)
+            if not bitmask_conditions(rows):
+                results.append((index, None, None, None, None))
+                continue
+            graph = graph6.to_networkx(rows)
+            start_time = timeit.default_timer()
+            try:
+                row, record = run_with_budget(limit, graph_results,
+                                              index, graph)
+            except tuple(BUDGET_ERRORS) as error:
+                if hard:
+                    record = deferred_record(index, error)
+                    row = org_row(record)
                 else:
-                    c_big = f"|{i}|Clique graph has at least 23 vertices|||||\n"
-                    the_file.write(c_big)
-                end_time = timeit.default_timer()
-                print(f" Graph {i} took {end_time-start_time}")
+                    row, record = None, None
+                    deferred.append((index, line))
+            end_time = timeit.default_timer()
+            events = STATS.take_events() if STATS is not None else None
+            results.append((index, row, record, end_time-start_time,
+                            events))
+    rules = STATS.take_rules() if STATS is not None else {}
+    return results, end_offset, rules, deferred, take_dedup_counts()
+
+
+def graph6_chunks(filename, chunk_size, offset=0, first_index=0,
+                  start=0, stop=None):
+    """Yields the graphs of a graph6 file numbered from start up to stop as
+    lists of at most chunk_size (index, graph6 bytes) pairs, each one
+    together with the byte offset where it ends.
+
+    Reading starts at offset, where the graph numbered first_index is
+    expected to be, so that earlier graphs are not read at all."""
+    chunk = []
+    lines = graph6.read_lines(filename, offset, first_index, start, stop)
+    for index, line, offset in lines:
+        chunk.append((index, line))
+        if len(chunk) == chunk_size:
+            yield chunk, offset
+            chunk = []
+    if chunk:
+        yield chunk, offset
+
+
+def input_files(patterns):
+    """Expands the file names and glob patterns given in the command line"""
+    filenames = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        filenames.extend(matches if matches else [pattern])
+    return filenames
+
+
+def read_checkpoint(checkpoint):
+    """Returns the contents of the checkpoint file, a dictionary from
+    input files to their progress"""
+    if not os.path.exists(checkpoint):
+        return {}
+    with open(checkpoint, encoding="utf8") as the_file:
+        return json.load(the_file)
+
+
+def write_checkpoint(checkpoint, progress):
+    """Atomically replaces the checkpoint file"""
+    temporary = checkpoint + ".tmp"
+    with open(temporary, 'w', encoding="utf8") as the_file:
+        json.dump(progress, the_file, indent=1)
+    os.replace(temporary, checkpoint)
+
+
+def write_results(processed, the_file, name, trace_file=None, sink=None):
+    """Writes the results of a chunk given by process_chunk to the results
+    table the_file of the input file name, to trace_file and to sink"""
+    for index, row, record, elapsed, events in processed:
+        print("\r", end='')
+        print(f"Currently on graph {index} of {name}", end='', flush=True)
+        if row is not None:
+            the_file.write(row)
+        if record is not None and sink is not None:
+            sink.add(flatten(record, name, elapsed))
+        if elapsed is not None:
+            print(f" Graph {index} took {elapsed}")
+        if events is not None and trace_file is not None:
+            trace = {"file": name, "index": index,
+                     "time": elapsed, "events": events}
+            trace_file.write(json.dumps(trace) + "\n")
+
+
+def add_dedup_counts(total, counts):
+    for name, (hits, misses) in counts.items():
+        previous = total.setdefault(name, [0, 0])
+        previous[0] = previous[0] + hits
+        previous[1] = previous[1] + misses
+
+
+def print_dedup_counts(shard, total):
+    """Prints the fraction of graphs of shard whose p(K(p(G))) was found
+    among the isomorphism classes already computed"""
+    for name, (hits, misses) in sorted(total.items()):
+        if hits + misses:
+            print(f"{shard}: dedup of {name} found {hits} of "
+                  f"{hits + misses} graphs ({hits/(hits + misses):.1%})")
+
+
+def process_file(filename, mapper, progress, profile=None, trace_file=None,
+                 sink=None):
+    """Writes the results table of a graph6 file, using mapper to send the
+    chunks to process_chunk.
+
+    progress is the checkpoint dictionary. If the run resumes and it has
+    an entry for filename, processing continues after the last finished
+    graph, and the results file is cut back to its size at that point.
+    Otherwise the results file is started anew and the entry replaced,
+    keeping those of other files. The rule
+    statistics of the workers are added to profile, the rule calls of
+    every graph are written to trace_file as JSON lines and the rows of
+    the table are added to sink as typed columns.
+
+    Graphs which exceed their budget are kept in the checkpoint as the
+    hard queue, which is processed after the rest of the file, so their
+    rows come at the end of the table. The dedup hit rates of the file
+    are printed at the end."""
+    parts = filename.split('/')
+    if args.iterate > 0:
+        results = f"iterated_homotopy_types_{parts[-1]}.org"
+        heading = iterated_heading(args.iterate)
+    else:
+        results = f"homotopy_types_{parts[-1]}.org"
+        heading = HEADING
+    key = os.path.abspath(filename)
+    if args.iterate > 0:
+        key = key + ":iterate"
+    done = progress.get(key) if args.resume else None
+    if done is not None and os.path.exists(results):
+        with open(results, 'r+', encoding="utf8") as the_file:
+            the_file.truncate(done["results_size"])
+        offset, first_index = done["offset"], done["index"] + 1
+        deferred = done.get("deferred", [])
+    else:
+        offset, first_index = 0, 0
+        deferred = []
+        progress.pop(key, None)
+        with open(results, 'w', encoding="utf8"):
+            pass
+    with open(results, 'a', encoding="utf8") as the_file:
+        if the_file.tell() == 0:
+            the_file.write(heading)
+        chunks = graph6_chunks(filename, args.chunk_size, offset,
+                               first_index, args.start, args.stop)
+        tasks = ((chunk, end_offset, False) for chunk, end_offset in chunks)
+        dedup = {}
+        for processed, end_offset, rules, new, counts in mapper(process_chunk,
+                                                                tasks):
+            write_results(processed, the_file, parts[-1], trace_file, sink)
+            add_dedup_counts(dedup, counts)
+            if profile is not None:
+                profile.merge(rules)
+            deferred.extend([i, line.decode("ascii")] for i, line in new)
+            the_file.flush()
+            if sink is not None:
+                sink.flush()
+            progress[key] = {"index": processed[-1][0],
+                             "offset": end_offset,
+                             "results_size": the_file.tell(),
+                             "deferred": deferred}
+            write_checkpoint(args.checkpoint, progress)
+        hard_tasks = [([(i, line.encode("ascii"))
+                        for i, line in deferred[j:j+args.chunk_size]],
+                       None, True)
+                      for j in range(0, len(deferred), args.chunk_size)]
+        for processed, _, rules, _, counts in mapper(process_chunk,
+                                                     hard_tasks):
+            write_results(processed, the_file, parts[-1], trace_file, sink)
+            add_dedup_counts(dedup, counts)
+            if profile is not None:
+                profile.merge(rules)
+            del deferred[:len(processed)]
+            the_file.flush()
+            if sink is not None:
+                sink.flush()
+            progress[key]["results_size"] = the_file.tell()
+            write_checkpoint(args.checkpoint, progress)
         print("\n")
+        print_dedup_counts(parts[-1], dedup)
+
+
+def main():
+    """Main function"""
+    filenames = input_files(args.filenames)
+    progress = read_checkpoint(args.checkpoint)
+    workers = args.workers or multiprocessing.cpu_count()
+    profile = RuleStats() if args.profile else None
+    trace_file = open(args.trace, 'a', encoding="utf8") if args.trace else None
+    sink = open_sink(args.output, args.batch_size) if args.output else None
+    try:
+        if workers == 1:
+            configure(args)
+            for filename in filenames:
+                process_file(filename, map, progress, profile, trace_file,
+                             sink)
+        else:
+            with multiprocessing.Pool(workers, configure, (args,)) as pool:
+                for filename in filenames:
+                    process_file(filename, pool.imap, progress,
+                                 profile, trace_file, sink)
+    finally:
+        if trace_file is not None:
+            trace_file.close()
+        if sink is not None:
+            sink.close()
+        if profile is not None:
+            profile.write(args.profile)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument("filename", help="name of the file")
+    parser.add_argument("filenames", nargs='+',
+                        help="graph6 files or glob patterns, "
+                        "e.g. 'data/graph10c*.g6'")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes (0 uses every core)")
+    parser.add_argument("--chunk-size", type=int, default=200,
+                        help="number of graphs sent to a worker at a time")
+    parser.add_argument("--start", type=int, default=0,
+                        help="index of the first graph of each file to "
+                        "process")
+    parser.add_argument("--stop", type=int,
+                        help="index of the graph of each file where "
+                        "processing stops, not included")
+    parser.add_argument("--iterate", type=int, default=0,
+                        help="number of iterated clique graphs whose "
+                        "homotopy types are computed, instead of comparing "
+                        "G and K(G)")
+    parser.add_argument("--clique-bound", type=int, default=23,
+                        help="largest iterated clique graph computed by "
+                        "--iterate")
+    parser.add_argument("--checkpoint", default="homsmall_checkpoint.json",
+                        help="file recording the last finished graph of "
+                        "each input file")
+    parser.add_argument("--cache-size", type=int, default=4096,
+                        help="isomorphism classes of graphs whose homotopy "
+                        "type is kept in memory (0 disables the cache)")
+    parser.add_argument("--dedup-size", type=int, default=4096,
+                        help="isomorphism classes of p(K(p(G))) whose results "
+                        "are shared by the graphs of the same class (0 "
+                        "disables the dedup)")
+    parser.add_argument("--cache-db",
+                        help="SQLite file storing homotopy types between "
+                        "runs, shared by the worker processes")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed for the shuffled orders of Dong's matching")
+    parser.add_argument("--attempts", type=int, default=5,
+                        help="vertex orders tried for Dong's matching after "
+                        "the default one")
+    parser.add_argument("--backend", choices=["pycliques", "bitmask"],
+                        default="pycliques",
+                        help="code used for cliques, clique graphs, paring "
+                        "and the Helly test")
+    parser.add_argument("--rules",
+                        help="comma separated names of the rules tried by "
+                        "homotopy_type, in order (default: all of them)")
+    parser.add_argument("--profile",
+                        help="file for the statistics of every rule, CSV "
+                        "if it ends with .csv and JSON otherwise")
+    parser.add_argument("--trace",
+                        help="file for the rule calls of every graph, as "
+                        "JSON lines")
+    parser.add_argument("--time-limit", type=float,
+                        help="seconds a graph may take before it is moved "
+                        "to the hard queue, processed at the end of its file")
+    parser.add_argument("--hard-time-limit", type=float,
+                        help="seconds a graph of the hard queue may take "
+                        "(default: ten times --time-limit)")
+    parser.add_argument("--memory-limit", type=int,
+                        help="megabytes each process may allocate while "
+                        "processing graphs; graphs which run out are moved "
+                        "to the hard queue")
+    parser.add_argument("--hard-memory-limit", type=int,
+                        help="megabytes each process may allocate while "
+                        "processing the hard queue (default: four times "
+                        "--memory-limit)")
+    parser.add_argument("--output",
+                        help="file also receiving the rows of the tables of "
+                        "every input file as typed columns: CSV if it ends "
+                        "with .csv, SQLite with .db or .sqlite, and a "
+                        "directory of Parquet files with .parquet")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                        help="rows kept before they are written to --output")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip the graphs already finished according "
+                        "to the checkpoint file")
     args = parser.parse_args()
+    if args.output and args.iterate > 0:
+        parser.error("--output is not available with --iterate")
+    if args.rules:
+        unknown = [name for name in args.rules.split(",")
+                   if name not in dict(ALL_RULES)]
+        if unknown:
+            parser.error(f"unknown rules {', '.join(unknown)}; choose among "
+                         f"{', '.join(name for name, rule in ALL_RULES)}")
+    if args.hard_time_limit is None and args.time_limit:
+        args.hard_time_limit = 10 * args.time_limit
+    if args.hard_memory_limit is None and args.memory_limit:
+        args.hard_memory_limit = 4 * args.memory_limit
 
     main()
@@ -0,0 +1,103 @@
+"""
+Caches results of graph computations up to isomorphism
+"""
+import sqlite3
+import sys
+from collections import OrderedDict
+import networkx as nx
+
+
+KEY_FORMAT = f"wl3:networkx-{nx.__version__}"
+
+
+def graph_key(graph):
+    """Returns a string which is the same for isomorphic graphs.
+
+    Non-isomorphic graphs may share a key, so entries with the same key
+    are told apart with an isomorphism test."""
+    w_l = nx.weisfeiler_lehman_graph_hash(graph, iterations=3)
+    return f"{graph.order()}:{graph.size()}:{w_l}"
+
+
+class GraphCache(object):
+    """Bounded LRU mapping from isomorphism classes of graphs to strings,
+    optionally backed by a SQLite database.
+
+    The database may be shared by several processes, each one with its
+    own GraphCache, and it survives between runs. Its keys depend on the
+    hashes of networkx, so the database records KEY_FORMAT and its rows
+    are dropped when it was written with another one."""
+
+    def __init__(self, maxsize=4096, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT, graph6 BLOB, value TEXT, "
+                "PRIMARY KEY (key, graph6))")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS settings "
+                "(name TEXT PRIMARY KEY, value TEXT)")
+            self._check_format()
+            self.connection.commit()
+
+    def _check_format(self):
+        """Empties the database if its keys were made with a KEY_FORMAT
+        other than the current one"""
+        row = self.connection.execute(
+            "SELECT value FROM settings WHERE name = 'key_format'").fetchone()
+        if row is not None and row[0] == KEY_FORMAT:
+            return
+        count = self.connection.execute(
+            "SELECT COUNT(*) FROM results").fetchone()[0]
+        if count:
+            print(f"Dropping the {count} entries of {self.path}, whose keys "
+                  f"have format {row[0] if row else 'unknown'}, not "
+                  f"{KEY_FORMAT}", file=sys.stderr)
+            self.connection.execute("DELETE FROM results")
+        self.connection.execute(
+            "INSERT OR REPLACE INTO settings VALUES ('key_format', ?)",
+            (KEY_FORMAT,))
+
+    def _bucket(self, key):
+        """Returns the list of (graph, value) pairs stored under key"""
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        bucket = []
+        if self.connection is not None:
+            rows = self.connection.execute(
+                "SELECT graph6, value FROM results WHERE key = ?", (key,))
+            bucket = [(nx.from_graph6_bytes(g6), value) for g6, value in rows]
+        self.entries[key] = bucket
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return bucket
+
+    def get(self, graph):
+        """Returns the value stored for a graph isomorphic to graph, or None"""
+        for other, value in self._bucket(graph_key(graph)):
+            if nx.is_isomorphic(graph, other):
+                self.hits = self.hits + 1
+                return value
+        self.misses = self.misses + 1
+        return None
+
+    def put(self, graph, value):
+        """Stores value for the isomorphism class of graph"""
+        key = graph_key(graph)
+        graph = nx.convert_node_labels_to_integers(graph)
+        self._bucket(key).append((graph, value))
+        if self.connection is not None:
+            g6 = nx.to_graph6_bytes(graph, header=False).strip()
+            self.connection.execute(
+                "INSERT OR IGNORE INTO results VALUES (?, ?, ?)",
+                (key, g6, value))
+            self.connection.commit()
@@ -0,0 +1,126 @@
+"""
+Homotopy types of wedges of spheres
+"""
+import json
+import re
+
+
+TEX_SUMMAND = re.compile(r"(?:\\vee_\{(\d+)\})?S\^\{(\d+)\}")
+
+
+class HomotopyType(object):
+    """The homotopy type of a wedge of spheres.
+
+    spheres[i] is the number of copies of S^i, without trailing zeros, so
+    the contractible type has spheres == (). If determined is False the
+    homotopy type is not known, and spheres holds the reduced Betti
+    numbers of the space instead. Operations return new values."""
+
+    __slots__ = ("spheres", "determined")
+
+    def __init__(self, spheres=(), determined=True):
+        spheres = [int(n) for n in spheres]
+        while len(spheres) > 0 and spheres[-1] == 0:
+            del spheres[-1]
+        self.spheres = tuple(spheres)
+        self.determined = determined
+
+    @classmethod
+    def sphere(cls, dimension, copies=1):
+        """Returns the wedge of copies spheres of the given dimension"""
+        return cls([0] * dimension + [copies])
+
+    @classmethod
+    def undetermined(cls, bettis):
+        """Returns an unknown homotopy type with the given reduced Betti
+        numbers"""
+        return cls(bettis, determined=False)
+
+    def is_contractible(self):
+        return self.determined and len(self.spheres) == 0
+
+    def has_sphere(self, dimension):
+        """Returns True if the type is known to have a sphere of the given
+        dimension as a wedge summand"""
+        return (self.determined and dimension < len(self.spheres)
+                and self.spheres[dimension] > 0)
+
+    def wedge(self, other):
+        """Returns the homotopy type of the wedge of self and other"""
+        length = max(len(self.spheres), len(other.spheres))
+        first = self.spheres + (0,) * (length - len(self.spheres))
+        second = other.spheres + (0,) * (length - len(other.spheres))
+        return HomotopyType([a + b for a, b in zip(first, second)],
+                            self.determined and other.determined)
+
+    def suspend(self, times=1):
+        """Returns the homotopy type of the times-fold suspension"""
+        if len(self.spheres) == 0:
+            return self
+        return HomotopyType((0,) * times + self.spheres, self.determined)
+
+    def join(self, other):
+        """Returns the homotopy type of the join of self and other, using
+        that the join of S^a and S^b is S^(a+b+1)"""
+        product = [0] * (len(self.spheres) + len(other.spheres))
+        for i, a in enumerate(self.spheres):
+            for j, b in enumerate(other.spheres):
+                product[i + j + 1] += a * b
+        return HomotopyType(product, self.determined and other.determined)
+
+    def encode(self):
+        """Returns a short string from which decode recovers the type"""
+        prefix = "" if self.determined else "?"
+        return prefix + ",".join(str(n) for n in self.spheres)
+
+    @classmethod
+    def decode(cls, string):
+        determined = not string.startswith("?")
+        string = string.lstrip("?")
+        spheres = [int(n) for n in string.split(",")] if string else []
+        return cls(spheres, determined)
+
+    def to_tex(self):
+        """Returns the TeX string of the type, as written in the results
+        tables. Unknown types are written as their list of Betti numbers"""
+        if not self.determined:
+            return str(list(self.spheres))
+        if len(self.spheres) == 0:
+            return "Contractible"
+        summands = []
+        for dimension, copies in enumerate(self.spheres):
+            if copies == 1:
+                summands.append(f"S^{ {dimension} }")
+            elif copies > 1:
+                summands.append(f"\\vee_{ {copies} }S^{ {dimension} }")
+        return "\\(" + "\\vee ".join(summands) + "\\)"
+
+    @classmethod
+    def from_tex(cls, string):
+        """Returns the type written as string by to_tex"""
+        if string.startswith("["):
+            return cls.undetermined(json.loads(string))
+        spheres = []
+        for copies, dimension in TEX_SUMMAND.findall(string):
+            dimension = int(dimension)
+            while len(spheres) <= dimension:
+                spheres.append(0)
+            spheres[dimension] += int(copies or 1)
+        return cls(spheres)
+
+    def __str__(self):
+        return self.to_tex()
+
+    def __repr__(self):
+        return f"HomotopyType({self.spheres!r}, determined={self.determined})"
+
+    def __eq__(self, other):
+        return (isinstance(other, HomotopyType) and
+                self.spheres == other.spheres and
+                self.determined == other.determined)
+
+    def __hash__(self):
+        return hash((self.spheres, self.determined))
+
+
+CONTRACTIBLE = HomotopyType()
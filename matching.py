@@ -0,0 +1,98 @@
+"""
+Vertex orders for Dong's matching, tried within an attempt budget
+"""
+import random
+
+
+def is_perfect(dong):
+    """Returns True if the critical cells of a matching all have the same
+    dimension, so the complex is a wedge of spheres"""
+    return len({len(simplex) for simplex in dong}) <= 1
+
+
+def complex_key(s_complex):
+    """Returns the numbers of vertices and facets of each dimension of a
+    complex, used to recognize similar complexes"""
+    sizes = {}
+    for facet in s_complex.facet_set:
+        sizes[len(facet)] = sizes.get(len(facet), 0) + 1
+    return (len(s_complex.vertex_set),) + tuple(sorted(sizes.items()))
+
+
+def degree_order(s_complex):
+    """Orders vertices by decreasing degree in the 1-skeleton"""
+    neighbours = {v: set() for v in s_complex.vertex_set}
+    for facet in s_complex.facet_set:
+        for vertex in facet:
+            neighbours[vertex].update(facet)
+
+    def order(vertices):
+        return sorted(sorted(vertices, key=repr),
+                      key=lambda v: -len(neighbours[v]))
+    return order
+
+
+def link_order(s_complex):
+    """Orders vertices by decreasing number of facets in their links"""
+    facets = {v: 0 for v in s_complex.vertex_set}
+    for facet in s_complex.facet_set:
+        for vertex in facet:
+            facets[vertex] += 1
+
+    def order(vertices):
+        return sorted(sorted(vertices, key=repr), key=lambda v: -facets[v])
+    return order
+
+
+class MatchingStrategy(object):
+    """Tries vertex orders for Dong's matching until the critical cells
+    have a single dimension.
+
+    orders are names of the heuristic orders tried first; the rest of the
+    attempts use shuffles drawn from a generator seeded with seed and the
+    complex itself, so results do not depend on the order in which
+    complexes are processed. The named order which succeeded for a
+    complex is tried first for complexes with the same complex_key."""
+
+    ORDERS = {"degree": degree_order, "link": link_order}
+
+    def __init__(self, seed=0, attempts=5, orders=("degree", "link")):
+        self.seed = seed
+        self.attempts = attempts
+        self.orders = list(orders)
+        self.successes = {}
+
+    def _shuffles(self, s_complex):
+        facets = sorted(sorted(map(repr, f)) for f in s_complex.facet_set)
+        generator = random.Random(f"{self.seed}:{facets}")
+
+        def order(vertices):
+            vertices = sorted(vertices, key=repr)
+            generator.shuffle(vertices)
+            return vertices
+        return order
+
+    def match(self, s_complex):
+        """Returns the set of critical cells of the best matching found,
+        the one with fewest critical cells if none is perfect"""
+        key = complex_key(s_complex)
+        names = list(self.orders)
+        if key in self.successes:
+            names.remove(self.successes[key])
+            names.insert(0, self.successes[key])
+        shuffle = self._shuffles(s_complex)
+        best = None
+        for attempt in range(self.attempts):
+            name = names[attempt] if attempt < len(names) else "shuffle"
+            if name == "shuffle":
+                order = shuffle
+            else:
+                order = self.ORDERS[name](s_complex)
+            dong = s_complex.dong_matching(order_function=order)
+            if is_perfect(dong):
+                if name != "shuffle":
+                    self.successes[key] = name
+                return dong
+            if best is None or len(dong) < len(best):
+                best = dong
+        return best
@@ -0,0 +1,203 @@
+"""
+Acyclic matchings of simplicial complexes found by coreductions, and the
+homology of their Morse complexes
+"""
+from collections import deque
+from bitcomplex import BitComplex, bits
+from homology import _faces_by_dimension, _reduce_mod2, _smith_diagonal
+
+
+def _size(mask):
+    return bin(mask).count("1")
+
+
+def _incidence(face, sub):
+    """Returns the sign of the face sub in the boundary of face, with faces
+    oriented by the order of their vertices"""
+    return -1 if _size(face & ((face ^ sub) - 1)) % 2 else 1
+
+
+class MorseMatching(object):
+    """An acyclic matching on the nonempty faces of a complex, given by the
+    masks of its facets.
+
+    It is built greedily with coreductions: a face with a single face
+    left in its boundary is matched with it, and when there is none, a
+    face of the lowest dimension left, whose boundary is then empty,
+    becomes critical. up maps every
+    matched face to the face of one dimension more it is matched with."""
+
+    def __init__(self, facets):
+        self.faces = _faces_by_dimension(facets)
+        self.cofaces = {}
+        for dim, faces in enumerate(self.faces):
+            for face in faces:
+                self.cofaces[face] = []
+                if dim > 0:
+                    for b in bits(face):
+                        self.cofaces[face ^ b].append(face)
+        self.critical = []
+        self.up = {}
+        self._match()
+
+    @classmethod
+    def from_complex(cls, s_complex):
+        """Returns the MorseMatching of a pycliques SimplicialComplex, with
+        faces as masks of BitComplex.from_complex(s_complex)"""
+        return cls(BitComplex.from_complex(s_complex).facets)
+
+    def _match(self):
+        left = {}
+        for dim, faces in enumerate(self.faces):
+            for face in faces:
+                left[face] = dim + 1 if dim > 0 else 0
+        queue = deque()
+
+        def remove(face):
+            del left[face]
+            for coface in self.cofaces[face]:
+                if coface in left:
+                    left[coface] = left[coface] - 1
+                    if left[coface] == 1:
+                        queue.append(coface)
+
+        for faces in self.faces:
+            for face in sorted(faces):
+                if face not in left:
+                    continue
+                self.critical.append(face)
+                remove(face)
+                while queue:
+                    coface = queue.popleft()
+                    if left.get(coface) != 1:
+                        continue
+                    free = next(coface ^ b for b in bits(coface)
+                                if coface ^ b in left)
+                    self.up[free] = coface
+                    remove(free)
+                    remove(coface)
+
+    def critical_dimensions(self):
+        """Returns the list of the numbers of critical faces of every
+        dimension"""
+        counts = []
+        for face in self.critical:
+            dim = _size(face) - 1
+            while len(counts) <= dim:
+                counts.append(0)
+            counts[dim] += 1
+        return counts
+
+    def f_vector(self):
+        """Returns the list of the numbers of faces of every dimension"""
+        return [len(faces) for faces in self.faces]
+
+    def euler_characteristic(self):
+        """Returns the reduced Euler characteristic, from the f-vector"""
+        return sum((-1) ** dim * n for dim, n in enumerate(self.f_vector())) - 1
+
+    def sphere_dimension(self):
+        """Returns d if the critical faces are a vertex and faces of
+        dimension d, so the complex is a wedge of d-spheres, -1 if the
+        complex is contractible and None otherwise"""
+        counts = self.critical_dimensions()
+        if not counts or counts[0] != 1:
+            return None
+        dimensions = [d for d, n in enumerate(counts) if n > 0 and d > 0]
+        if not dimensions:
+            return -1
+        return dimensions[0] if len(dimensions) == 1 else None
+
+    def boundary(self, face):
+        """Returns the set of critical faces in the boundary of the critical
+        face in the Morse complex, with coefficients in GF(2), found by
+        following the gradient paths which leave its faces"""
+        critical = set(self.critical)
+        chain = set()
+        pending = {face ^ b for b in bits(face)} if _size(face) > 1 else set()
+        while pending:
+            cell = pending.pop()
+            if cell in critical:
+                chain ^= {cell}
+            elif cell in self.up:
+                coface = self.up[cell]
+                pending ^= {coface ^ b for b in bits(coface)} - {cell}
+        return chain
+
+    def integral_boundary(self, face):
+        """Returns the dictionary from critical faces to their coefficients
+        in the boundary of the critical face in the Morse complex over the
+        integers, following the gradient paths like boundary"""
+        critical = set(self.critical)
+        chain = {}
+        pending = {}
+        if _size(face) > 1:
+            for b in bits(face):
+                pending[face ^ b] = _incidence(face, face ^ b)
+        while pending:
+            cell, coefficient = pending.popitem()
+            if coefficient == 0:
+                continue
+            if cell in critical:
+                chain[cell] = chain.get(cell, 0) + coefficient
+            elif cell in self.up:
+                coface = self.up[cell]
+                factor = -coefficient * _incidence(coface, cell)
+                for b in bits(coface):
+                    if coface ^ b != cell:
+                        pending[coface ^ b] = (pending.get(coface ^ b, 0) +
+                                               factor * _incidence(coface,
+                                                                   coface ^ b))
+        return {cell: c for cell, c in chain.items() if c}
+
+    def integral_homology(self, top=None):
+        """Returns the list of (rank, torsion) pairs of the reduced integral
+        homology groups in dimensions up to top (by default, up to that of
+        the critical faces), where torsion lists the orders greater than 1
+        of the cyclic summands, computed from the Morse complex"""
+        by_dimension = {}
+        for face in self.critical:
+            by_dimension.setdefault(_size(face) - 1, []).append(face)
+        if top is None:
+            top = max(by_dimension, default=-1)
+        ranks = [0] * (top + 2)
+        torsion = [[] for dim in range(top + 1)]
+        for dim in range(1, top + 2):
+            rows = {f: i for i, f in enumerate(by_dimension.get(dim - 1, []))}
+            columns = [{rows[cell]: c for cell, c
+                        in self.integral_boundary(face).items()}
+                       for face in by_dimension.get(dim, [])]
+            diagonal = _smith_diagonal(columns, len(rows))
+            ranks[dim] = len(diagonal)
+            torsion[dim - 1] = [d for d in diagonal if d > 1]
+        groups = [(len(by_dimension.get(dim, [])) - ranks[dim] - ranks[dim + 1],
+                   torsion[dim]) for dim in range(top + 1)]
+        if groups:
+            groups[0] = (groups[0][0] - 1, groups[0][1])
+        return groups
+
+    def betti_numbers(self):
+        """Returns the list of reduced Betti numbers over GF(2), computed
+        from the Morse complex, without trailing zeros"""
+        if not self.critical:
+            return []
+        by_dimension = {}
+        for face in self.critical:
+            by_dimension.setdefault(_size(face) - 1, []).append(face)
+        top = max(by_dimension)
+        ranks = [0] * (top + 2)
+        for dim in range(1, top + 1):
+            rows = {f: i for i, f in enumerate(by_dimension.get(dim - 1, []))}
+            columns = []
+            for face in by_dimension.get(dim, []):
+                column = 0
+                for cell in self.boundary(face):
+                    column = column | (1 << rows[cell])
+                columns.append(column)
+            ranks[dim] = _reduce_mod2(columns, set())[0]
+        bettis = [len(by_dimension.get(dim, [])) - ranks[dim] - ranks[dim + 1]
+                  for dim in range(top + 1)]
+        bettis[0] = bettis[0] - 1
+        while bettis and bettis[-1] == 0:
+            bettis.pop()
+        return bettis
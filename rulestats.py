@@ -0,0 +1,79 @@
+"""
+Statistics of the rules tried by homotopy_type
+"""
+import csv
+import json
+
+
+class RuleStats(object):
+    """Counts, for every rule, the calls, the calls which decided the
+    homotopy type, the time spent and the recursion depth of the calls.
+
+    If trace is True, every call is also kept as an event until
+    take_events is called."""
+
+    def __init__(self, trace=False):
+        self.rules = {}
+        self.depth = 0
+        self.events = [] if trace else None
+
+    def record(self, name, success, elapsed):
+        """Records a call of the rule name at the current depth"""
+        counts = self.rules.setdefault(name, [0, 0, 0.0, 0, 0])
+        counts[0] += 1
+        counts[1] += int(bool(success))
+        counts[2] += elapsed
+        counts[3] += self.depth
+        counts[4] = max(counts[4], self.depth)
+        if self.events is not None:
+            self.events.append([name, bool(success), elapsed, self.depth])
+
+    def take_events(self):
+        """Returns the events recorded since the last call"""
+        events = self.events
+        self.events = [] if events is not None else None
+        return events
+
+    def take_rules(self):
+        """Returns the counts recorded since the last call, in the format
+        accepted by merge"""
+        rules = self.rules
+        self.rules = {}
+        return rules
+
+    def merge(self, rules):
+        """Adds counts taken from another RuleStats"""
+        for name, other in rules.items():
+            counts = self.rules.setdefault(name, [0, 0, 0.0, 0, 0])
+            for i in range(4):
+                counts[i] += other[i]
+            counts[4] = max(counts[4], other[4])
+
+    def summary(self):
+        """Returns a list with a dictionary of statistics for every rule"""
+        rows = []
+        for name, (calls, successes, time, depths, max_depth) in \
+                self.rules.items():
+            rows.append({"rule": name,
+                         "calls": calls,
+                         "successes": successes,
+                         "success_rate": successes/calls,
+                         "time": time,
+                         "mean_time": time/calls,
+                         "mean_depth": depths/calls,
+                         "max_depth": max_depth})
+        return rows
+
+    def write(self, path):
+        """Writes the summary as CSV if path ends with .csv, as JSON
+        otherwise"""
+        rows = self.summary()
+        with open(path, 'w', encoding="utf8", newline='') as the_file:
+            if path.endswith(".csv"):
+                fields = ["rule", "calls", "successes", "success_rate",
+                          "time", "mean_time", "mean_depth", "max_depth"]
+                writer = csv.DictWriter(the_file, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                json.dump(rows, the_file, indent=1)
@@ -0,0 +1,153 @@
+"""
+Cheap invariants of batches of small graphs, computed at once with NumPy
+on their adjacency bitmasks, used to settle the graphs whose homotopy type
+is read off from them
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+from bitgraph import MAX_ORDER
+
+
+FACE_ORDER = 12
+
+
+def _popcount(array):
+    """Returns the number of bits set in each entry of a uint64 array"""
+    if hasattr(numpy, "bitwise_count"):
+        return numpy.bitwise_count(array).astype(numpy.int64)
+    return _popcount_bytes(array)
+
+
+def _popcount_bytes(array):
+    """Like _popcount, unpacking the bytes of the entries, for numpy
+    versions before 2.0
+
+    >>> _popcount_bytes(numpy.array([[1, 3, 7], [15, 0, 1]],
+    ...                             dtype=numpy.uint64)).tolist()
+    [[1, 2, 3], [4, 0, 1]]
+    """
+    as_bytes = numpy.ascontiguousarray(array)[..., numpy.newaxis].view(
+        numpy.uint8)
+    return numpy.unpackbits(as_bytes, axis=-1).sum(axis=-1).astype(
+        numpy.int64)
+
+
+def row_array(batch):
+    """Returns the uint64 array of shape (graphs, largest order) of the
+    adjacency bitmasks of a batch, given as lists of rows as decoded by
+    graph6.decode, padded with empty rows, and the array of orders"""
+    orders = numpy.array([len(rows) for rows in batch], dtype=numpy.int64)
+    rows = numpy.zeros((len(batch), orders.max(initial=0)),
+                       dtype=numpy.uint64)
+    for number, graph_rows in enumerate(batch):
+        rows[number, :len(graph_rows)] = graph_rows
+    return rows, orders
+
+
+def _masks(rows, orders):
+    """Returns the masks of the vertices of each graph, as a (graphs, 1)
+    array, and the bit of every vertex"""
+    one = numpy.uint64(1)
+    vertex_bits = numpy.left_shift(one, numpy.arange(rows.shape[1],
+                                                     dtype=numpy.uint64))
+    full = numpy.where(orders == MAX_ORDER, ~numpy.uint64(0),
+                       numpy.left_shift(one, orders.astype(numpy.uint64)) - one)
+    return full[:, numpy.newaxis], vertex_bits
+
+
+def reach(rows, orders):
+    """Returns the array whose entry (g, v) is the mask of the connected
+    component of vertex v in graph g"""
+    full, vertex_bits = _masks(rows, orders)
+    result = (rows | vertex_bits) & full
+    while True:
+        previous = result
+        for v in range(rows.shape[1]):
+            contains = (result & vertex_bits[v]) != 0
+            result = numpy.where(contains, result | result[:, v:v+1], result)
+        if numpy.array_equal(result, previous):
+            return result
+
+
+def component_counts(components, orders):
+    """Returns the number of connected components of every graph, given
+    the masks of the components of its vertices as returned by reach"""
+    full, vertex_bits = _masks(components, orders)
+    lowest = components & (~components + numpy.uint64(1))
+    return ((lowest == vertex_bits) & ((vertex_bits & full) != 0)).sum(axis=1)
+
+
+def complement_rows(rows, orders):
+    """Returns the adjacency bitmasks of the complements"""
+    full, vertex_bits = _masks(rows, orders)
+    return numpy.where((vertex_bits & full) != 0,
+                       ~rows & ~vertex_bits & full, numpy.uint64(0))
+
+
+def pared_orders(rows, orders):
+    """Returns the number of vertices left in every graph after removing
+    dominated vertices, one at a time, while there are any and at least
+    two vertices are left"""
+    full, vertex_bits = _masks(rows, orders)
+    alive = full[:, 0].copy()
+    while True:
+        closed = ((rows | vertex_bits) & alive[:, numpy.newaxis])
+        adjacent = (rows[:, :, numpy.newaxis] &
+                    vertex_bits[numpy.newaxis, numpy.newaxis, :]) != 0
+        dominated = ((closed[:, :, numpy.newaxis] &
+                      ~closed[:, numpy.newaxis, :]) == 0) & adjacent
+        dominated = dominated & ((alive[:, numpy.newaxis, numpy.newaxis] &
+                                  vertex_bits[numpy.newaxis, numpy.newaxis, :])
+                                 != 0)
+        dominated = dominated.any(axis=2) & (
+            (alive[:, numpy.newaxis] & vertex_bits) != 0)
+        dominated = dominated & (_popcount(alive) > 1)[:, numpy.newaxis]
+        if not dominated.any():
+            return _popcount(alive)
+        first = numpy.argmax(dominated, axis=1)
+        removed = numpy.where(dominated.any(axis=1), vertex_bits[first],
+                              numpy.uint64(0))
+        alive = alive & ~removed
+
+
+def f_vectors(rows, orders):
+    """Returns the array whose entry (g, k) is the number of cliques with
+    k+1 vertices of graph g, found by testing every set of vertices, so
+    the graphs should have at most FACE_ORDER vertices"""
+    width = rows.shape[1]
+    subsets = numpy.arange(1, 2**width, dtype=numpy.uint64)
+    full, vertex_bits = _masks(rows, orders)
+    cliques = (subsets[numpy.newaxis, :] & ~full) == 0
+    for v in range(width):
+        closed = (rows[:, v] | vertex_bits[v])[:, numpy.newaxis]
+        cliques &= (((subsets & vertex_bits[v]) == 0)[numpy.newaxis, :] |
+                    ((subsets[numpy.newaxis, :] & ~closed) == 0))
+    sizes = _popcount(subsets)
+    return numpy.stack([(cliques & (sizes == size)).sum(axis=1)
+                        for size in range(1, width + 1)], axis=1)
+
+
+def screen(batch):
+    """Returns a dictionary of arrays of invariants of a batch of graphs,
+    given as lists of adjacency bitmasks: order, max_degree, components,
+    complement_components, complement_reach (as in reach), pared_order
+    and, if every graph has at most FACE_ORDER vertices, f_vector and
+    euler, the reduced Euler characteristic of the clique complex"""
+    if numpy is None:
+        raise ImportError("Screening needs numpy")
+    rows, orders = row_array(batch)
+    c_reach = reach(complement_rows(rows, orders), orders)
+    invariants = {"order": orders,
+                  "max_degree": _popcount(rows).max(axis=1, initial=0),
+                  "components": component_counts(reach(rows, orders), orders),
+                  "complement_components": component_counts(c_reach, orders),
+                  "complement_reach": c_reach,
+                  "pared_order": pared_orders(rows, orders)}
+    if rows.shape[1] <= FACE_ORDER:
+        faces = f_vectors(rows, orders)
+        signs = (-1) ** numpy.arange(faces.shape[1])
+        invariants["f_vector"] = faces
+        invariants["euler"] = (faces * signs).sum(axis=1) - 1
+    return invariants
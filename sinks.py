@@ -0,0 +1,155 @@
+"""
+Writers of the results of homsmall as typed columns, in CSV, SQLite or
+Parquet files
+"""
+import csv
+import json
+import os
+import sqlite3
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+COLUMNS = [("file", str), ("index", int), ("order", int),
+           ("max_degree", int), ("helly", bool), ("k_helly", bool),
+           ("ht_g", list), ("ht_g_determined", bool),
+           ("ht_kg", list), ("ht_kg_determined", bool),
+           ("rule_g", str), ("rule_kg", str), ("status", str),
+           ("time", float), ("note", str)]
+
+
+def flatten(record, filename, elapsed):
+    """Returns the tuple of values of COLUMNS for a record of
+    homsmall.graph_record, with homotopy types given by their vectors of
+    sphere multiplicities"""
+    row = dict(record, file=filename, time=elapsed)
+    for column in ("ht_g", "ht_kg"):
+        h_type = record[column]
+        row[column] = list(h_type.spheres) if h_type is not None else None
+        row[column + "_determined"] = (h_type.determined
+                                       if h_type is not None else None)
+    return tuple(row[name] for name, kind in COLUMNS)
+
+
+class ResultSink(object):
+    """Keeps rows with the columns of COLUMNS and writes them at once when
+    there are batch_size of them or flush is called. Subclasses write the
+    batches with _write"""
+
+    def __init__(self, path, batch_size=1000):
+        self.path = path
+        self.batch_size = batch_size
+        self.rows = []
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self._write(self.rows)
+            self.rows = []
+
+    def close(self):
+        self.flush()
+
+    def _write(self, rows):
+        raise NotImplementedError
+
+
+class CSVSink(ResultSink):
+    """Appends the rows to a CSV file, with vectors written as JSON lists"""
+
+    def __init__(self, path, batch_size=1000):
+        super().__init__(path, batch_size)
+        self.file = open(path, 'a', encoding="utf8", newline='')
+        self.writer = csv.writer(self.file)
+        if self.file.tell() == 0:
+            self.writer.writerow([name for name, kind in COLUMNS])
+
+    def _write(self, rows):
+        self.writer.writerows([json.dumps(value) if isinstance(value, list)
+                               else value for value in row] for row in rows)
+        self.file.flush()
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+class SQLiteSink(ResultSink):
+    """Stores the rows in the table results of a SQLite database, one row
+    for each file and index, with vectors stored as JSON lists"""
+
+    TYPES = {str: "TEXT", int: "INTEGER", bool: "INTEGER", float: "REAL",
+             list: "TEXT"}
+
+    def __init__(self, path, batch_size=1000):
+        super().__init__(path, batch_size)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f'"{name}" {self.TYPES[kind]}'
+                            for name, kind in COLUMNS)
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS results "
+                                f"({columns}, PRIMARY KEY (file, \"index\"))")
+        self.connection.commit()
+
+    def _write(self, rows):
+        marks = ", ".join("?" * len(COLUMNS))
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO results VALUES ({marks})",
+            [[json.dumps(value) if isinstance(value, list) else value
+              for value in row] for row in rows])
+        self.connection.commit()
+
+    def close(self):
+        super().close()
+        self.connection.close()
+
+
+class ParquetSink(ResultSink):
+    """Writes the rows to a new Parquet file part-<n>.parquet of the
+    directory path, one row group per batch, so that the directory can be
+    read as a single dataset"""
+
+    def __init__(self, path, batch_size=1000):
+        if pyarrow is None:
+            raise ImportError("Parquet output needs pyarrow")
+        super().__init__(path, batch_size)
+        types = {str: pyarrow.string(), int: pyarrow.int64(),
+                 bool: pyarrow.bool_(), float: pyarrow.float64(),
+                 list: pyarrow.list_(pyarrow.int64())}
+        self.schema = pyarrow.schema([(name, types[kind])
+                                      for name, kind in COLUMNS])
+        os.makedirs(path, exist_ok=True)
+        part = 0
+        while os.path.exists(os.path.join(path, f"part-{part}.parquet")):
+            part = part + 1
+        self.writer = pyarrow.parquet.ParquetWriter(
+            os.path.join(path, f"part-{part}.parquet"), self.schema)
+
+    def _write(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=self.schema.field(i).type)
+             for i, column in enumerate(columns)], schema=self.schema))
+
+    def close(self):
+        super().close()
+        self.writer.close()
+
+
+def open_sink(path, batch_size=1000):
+    """Returns the sink for path according to its extension: .csv, .db,
+    .sqlite or .parquet"""
+    if path.endswith(".csv"):
+        return CSVSink(path, batch_size)
+    if path.endswith((".db", ".sqlite")):
+        return SQLiteSink(path, batch_size)
+    if path.endswith(".parquet"):
+        return ParquetSink(path, batch_size)
+    raise ValueError(f"Unknown output format of {path}")